@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from app.services.user_service import user_service
+from app.core.executors import HashingBusyError
 from app.core.security import create_access_token
 from app.schemas.user_schemas import Token
 
@@ -11,7 +12,15 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
     """
     Authenticates a user and returns a JWT access token.
     """
-    user = user_service.authenticate_user(email=form_data.username, password=form_data.password)
+    try:
+        user = await user_service.authenticate_user(email=form_data.username, password=form_data.password)
+    except HashingBusyError:
+        # Shed the login storm instead of queueing it behind prediction traffic
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many login attempts in progress, please retry shortly",
+            headers={"Retry-After": "1"},
+        )
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -1,28 +1,84 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from typing import Optional
 from uuid import UUID
-from app.schemas.user_schemas import UserInDB, HistoryItem
+from app.schemas.user_schemas import UserPrincipal, HistoryPage, HistoryStatsResponse, HistorySummary
 from app.core.security import get_current_active_user
+from app.db.blob_store import blob_store
+from app.services.history_stats import history_stats, summarize
 from app.services.user_service import user_service
 
 router = APIRouter()
 
-@router.get("", response_model=List[HistoryItem], summary="Get User Prediction History")
-async def get_user_history(current_user: UserInDB = Depends(get_current_active_user)):
+# Blobs are written once and never modified, so clients may cache them indefinitely
+IMAGE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+@router.get("", response_model=HistoryPage, summary="Get User Prediction History")
+async def get_user_history(
+    request: Request,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    current_user: UserPrincipal = Depends(get_current_active_user)
+):
     """
-    Retrieves the prediction history for the currently authenticated user.
+    Retrieves one page of the prediction history for the currently authenticated user, newest first.
+    Pass the returned **next_cursor** to fetch the following page.
     """
-    return current_user.history
+    try:
+        docs, next_cursor = await user_service.get_history_page(current_user.email, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    items = []
+    for doc in docs:
+        image_url = str(request.url_for("get_history_image", item_id=doc["id"]))
+        items.append(HistorySummary(**doc, image_url=image_url, thumbnail_url=f"{image_url}?thumbnail=true"))
+    return HistoryPage(items=items, next_cursor=next_cursor)
+
+@router.get("/stats", response_model=HistoryStatsResponse, summary="Get User Prediction Statistics")
+async def get_user_history_stats(current_user: UserPrincipal = Depends(get_current_active_user)):
+    """
+    Returns aggregates over the user's whole history: prediction count, average age and
+    confidence, an age histogram and per-month averages. Served from a summary document
+    kept up to date as predictions are saved and deleted, so it is one small read
+    however long the history is.
+    """
+    return summarize(await history_stats.get(current_user.email))
+
+@router.get("/{item_id}/image", summary="Get a History Item's Image")
+async def get_history_image(
+    request: Request,
+    item_id: UUID,
+    thumbnail: bool = False,
+    current_user: UserPrincipal = Depends(get_current_active_user)
+):
+    """
+    Streams the original upload (or its thumbnail) for a single history item.
+    """
+    ref = await user_service.get_history_image_ref(current_user.email, item_id, thumbnail=thumbnail)
+    if ref is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="History item not found.")
+    blob_id, content_type = ref
+
+    etag = f'"{blob_id}"'
+    headers = {"ETag": etag, "Cache-Control": IMAGE_CACHE_CONTROL}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    chunks = await blob_store.stream(blob_id)
+    if chunks is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Image not found.")
+    return StreamingResponse(chunks, media_type=content_type, headers=headers)
 
 @router.delete("/{item_id}", status_code=status.HTTP_204_NO_CONTENT, summary="Delete a History Item")
 async def delete_history_item(
     item_id: UUID,
-    current_user: UserInDB = Depends(get_current_active_user)
+    current_user: UserPrincipal = Depends(get_current_active_user)
 ):
     """
     Deletes a specific prediction from the user's history by its unique ID.
     """
-    success = user_service.delete_history_item(current_user.email, item_id)
+    success = await user_service.delete_history_item(current_user.email, item_id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -0,0 +1,128 @@
+import csv
+import io
+import logging
+from typing import List
+
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile, status
+from fastapi.responses import StreamingResponse
+
+from app.api.prediction import iter_upload
+from app.core.config import settings
+from app.core.security import get_current_active_user
+from app.schemas.response_schemas import ErrorResponse, JobResults, JobStatus
+from app.schemas.user_schemas import UserPrincipal
+from app.services.job_queue import FINISHED, JobQueueFullError, job_queue
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+RESULT_FIELDS = ["filename", "age", "confidence", "error"]
+
+
+def _status(job: dict) -> JobStatus:
+    return JobStatus(id=job["_id"], **job)
+
+
+@router.post(
+    "",
+    response_model=JobStatus,
+    status_code=status.HTTP_202_ACCEPTED,
+    responses={400: {"model": ErrorResponse}, 429: {"model": ErrorResponse}},
+    summary="Submit a scoring job",
+)
+async def submit_job(
+    files: List[UploadFile] = File(..., description="Image files (JPEG, PNG, WebP) or .zip archives of them"),
+    priority: int = Query(0, ge=0, le=9, description="Higher runs first"),
+    current_user: UserPrincipal = Depends(get_current_active_user)
+):
+    """
+    Queues images (or zip archives of images) for scoring and returns the job right
+    away. Poll **GET /jobs/{id}** (optionally with **wait** to long-poll) until it
+    finishes, then download **/jobs/{id}/results**.
+    """
+    try:
+        await job_queue.check_capacity(current_user.email)
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(e))
+
+    # Each image goes to the blob store as soon as it is read, so memory holds one image, not the upload
+    entries = []
+    try:
+        for file in files:
+            async for filename, content, error in iter_upload(file, settings.JOB_MAX_IMAGES):
+                if len(entries) == settings.JOB_MAX_IMAGES:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"Too many images. Maximum per job: {settings.JOB_MAX_IMAGES}"
+                    )
+                entries.append(await job_queue.store_item(filename, content, error))
+        if not entries:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No images found in the upload")
+        job = await job_queue.submit(current_user.email, entries, priority)
+    except JobQueueFullError as e:
+        await job_queue.discard_items(entries)
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(e))
+    except BaseException:
+        await job_queue.discard_items(entries)
+        raise
+    return _status(job)
+
+
+@router.get("/{job_id}", response_model=JobStatus, summary="Get a job's status")
+async def get_job(
+    job_id: str,
+    wait: float = Query(0, ge=0, description=f"Seconds to wait for progress (long-poll), at most {settings.JOB_LONG_POLL_MAX_SECONDS}"),
+    current_user: UserPrincipal = Depends(get_current_active_user)
+):
+    """
+    Returns the job's status and progress. With **wait**, responds as soon as the job
+    makes progress or finishes, or when the wait is over.
+    """
+    job = await job_queue.wait(current_user.email, job_id, wait) if wait else await job_queue.get(current_user.email, job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return _status(job)
+
+
+@router.get(
+    "/{job_id}/results",
+    response_model=JobResults,
+    responses={409: {"model": ErrorResponse}},
+    summary="Download a finished job's results",
+)
+async def get_job_results(
+    job_id: str,
+    format: str = Query("json", regex="^(json|csv)$"),
+    current_user: UserPrincipal = Depends(get_current_active_user)
+):
+    """
+    Returns one result per submitted image, as JSON or CSV. Failed and cancelled
+    jobs return the results recorded before they stopped.
+    """
+    job = await job_queue.get(current_user.email, job_id, with_results=True)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    if job["status"] not in FINISHED:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Job is still {job['status']}")
+    if format == "json":
+        return JobResults(id=job["_id"], status=job["status"], model_version=job.get("model_version"), results=job["results"])
+
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=RESULT_FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    writer.writerows(job["results"])
+    return StreamingResponse(
+        iter([buffer.getvalue()]),
+        media_type="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="job-{job_id}.csv"'},
+    )
+
+
+@router.delete("/{job_id}", response_model=JobStatus, summary="Cancel a job")
+async def cancel_job(job_id: str, current_user: UserPrincipal = Depends(get_current_active_user)):
+    """Cancels a queued or running job. Finished jobs are returned unchanged."""
+    job = await job_queue.cancel(current_user.email, job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return _status(job)
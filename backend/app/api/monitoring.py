@@ -0,0 +1,94 @@
+import asyncio
+import cProfile
+import io
+import logging
+import pstats
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+
+from app.core.admission import admission
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.security import get_current_admin_user
+from app.model.registry import model_registry
+from app.services.history_writer import history_writer
+from app.services.prediction_cache import prediction_cache
+from app.services.prediction_service import prediction_service
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["Monitoring"])
+
+# Values other components already track, read at scrape time instead of double-counted
+metrics.gauge(
+    "age_api_batch_queue_depth", "Images waiting for the micro-batcher",
+    callback=lambda: prediction_service.batcher.stats()["queue_depth"])
+metrics.gauge(
+    "age_api_admission_queue_depth", "Requests waiting for an admission slot on /predict",
+    callback=lambda: admission.queue_depth)
+metrics.gauge(
+    "age_api_history_pending", "History entries buffered by the write-behind writer",
+    callback=lambda: history_writer.pending)
+metrics.gauge(
+    "age_api_model_loaded", "1 once the model is loaded and warmed up", ["model"],
+    callback=lambda: {("default",): 1 if model_registry.is_loaded() else 0})
+metrics.counter(
+    "age_api_prediction_cache_lookups_total", "Prediction cache lookups by result", ["result"],
+    callback=lambda: {(result,): prediction_cache.stats()[key] for result, key in
+                      (("hit", "hits"), ("shared_hit", "shared_hits"), ("miss", "misses"))})
+
+_profile_lock = asyncio.Lock()
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics():
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+def _require_profiling():
+    # Hidden entirely unless switched on, before authentication is even attempted
+    if not settings.PROFILING_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+
+
+@router.get(
+    "/debug/profile",
+    response_class=PlainTextResponse,
+    dependencies=[Depends(_require_profiling), Depends(get_current_admin_user)],
+    summary="Profile the event loop for a few seconds",
+)
+async def profile(seconds: float = Query(5.0, gt=0)):
+    """
+    Profiles everything the event loop thread runs while the window is open (route
+    handlers, serialization, cache and database calls) and returns a text report.
+    Uses pyinstrument's sampling profiler when it is installed, cProfile otherwise.
+    Work running in the executor pools is not included.
+    """
+    if _profile_lock.locked():
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="A profile is already running")
+    seconds = min(seconds, settings.PROFILE_MAX_SECONDS)
+    async with _profile_lock:
+        logger.info(f"Profiling the event loop for {seconds:.1f}s")
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            Profiler = None
+
+        if Profiler is not None:
+            # async_mode="disabled" samples the whole thread, not just this request's task
+            profiler = Profiler(async_mode="disabled")
+            profiler.start()
+            await asyncio.sleep(seconds)
+            profiler.stop()
+            return profiler.output_text(unicode=True)
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        await asyncio.sleep(seconds)
+        profiler.disable()
+        report = io.StringIO()
+        pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(60)
+        return report.getvalue()
@@ -1,11 +1,25 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, status, Depends
-from typing import Optional
-from app.schemas.response_schemas import PredictionResponse, ErrorResponse
-from app.schemas.user_schemas import UserInDB
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query, Request, WebSocket, WebSocketDisconnect, status, Depends
+from typing import AsyncIterator, List, Optional, Tuple
+from app.schemas.response_schemas import BatchPredictionItem, BatchPredictionResponse, ModelReloadRequest, PredictionResponse, TensorPredictionResponse, ErrorResponse
+from app.schemas.user_schemas import UserPrincipal
 from app.services.prediction_service import prediction_service
-from app.core.security import get_current_user_optional, validate_file_size, validate_image_format
+from app.core.admission import AdmissionRejected, ClientDisconnected, admission, user_rate_limiter
+from app.core.security import get_current_admin_user, get_current_user_optional, validate_file_size, validate_image_format
+from app.core.uploads import UploadTooLargeError, read_upload_limited, sniff_image
 from app.core.config import settings
+from app.core.metrics import ERRORS, REQUESTS_IN_FLIGHT, STAGE_SECONDS, STREAM_FRAMES, instrument
+from app.services.prediction_cache import prediction_cache
+from app.services.preprocessing import NPY_MAGIC, TENSOR_CONTENT_TYPES
+from app.services.streaming import FrameSession
+from app.services.user_service import user_service
+from app.model.registry import model_registry
+from pathlib import Path
+import asyncio
+import io
+import json
 import logging
+import time
+import zipfile
 
 logger = logging.getLogger(__name__)
 
@@ -17,56 +31,429 @@ router = APIRouter(tags=["Age Prediction"])
     responses={
         400: {"model": ErrorResponse},
         413: {"model": ErrorResponse},
-        500: {"model": ErrorResponse}
+        429: {"model": ErrorResponse},
+        500: {"model": ErrorResponse},
+        503: {"model": ErrorResponse}
     },
     summary="Predict age from image",
     description="Upload an image to predict age. If authenticated, the result is saved to your history."
 )
+@instrument("predict")
 async def predict_age(
+    request: Request,
     file: UploadFile = File(..., description="Image file (JPEG, PNG, WebP)"),
-    current_user: Optional[UserInDB] = Depends(get_current_user_optional)
+    current_user: Optional[UserPrincipal] = Depends(get_current_user_optional)
 ):
     """
     Predicts age from an uploaded image.
     - **file**: Image file to analyze (max 10MB).
     - An optional **Authorization: Bearer <token>** header can be provided.
+
+    Returns 429 when the user exceeds their rate limit and 503 when the server is at
+    capacity, both with a Retry-After header.
     """
-    if not validate_image_format(file.content_type):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Invalid file type: {file.content_type}. Supported types: JPEG, PNG, WebP"
-        )
-    
     try:
-        file_content = await file.read()
-    except Exception as e:
-        logger.error(f"Error reading file: {str(e)}")
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Error reading uploaded file")
-    
-    if not validate_file_size(len(file_content), settings.MAX_FILE_SIZE):
+        user_rate_limiter.check(current_user.email if current_user else None)
+    except AdmissionRejected as e:
+        raise _shed(e)
+
+    try:
+        with STAGE_SECONDS.time(stage="upload_read"):
+            file_content = await read_upload_limited(file, settings.MAX_FILE_SIZE)
+    except UploadTooLargeError:
+        ERRORS.inc(type="too_large")
         raise HTTPException(
             status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
             detail=f"File too large. Maximum size: {settings.MAX_FILE_SIZE // (1024*1024)}MB"
         )
+    except Exception as e:
+        ERRORS.inc(type="upload_read")
+        logger.error(f"Error reading file: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Error reading uploaded file")
+
+    # The declared content type is not trusted; the header decides, before any pixels are decoded
+    error = _validate_image_header(file_content)
+    if error:
+        ERRORS.inc(type="invalid_image")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=error)
     
     try:
-        # Pass the optional user object to the service layer
-        predicted_age, confidence = await prediction_service.predict_age(file_content, current_user)
+        # Queued here (bounded in size and wait) rather than piling up inside the pools
+        async with admission.admit(request):
+            # Pass the optional user object to the service layer
+            predicted_age, confidence, model_version = await prediction_service.predict_age(file_content, current_user)
         
         return PredictionResponse(
             age=predicted_age,
             confidence=round(confidence, 2),
+            model_version=model_version,
             message="Age prediction successful"
         )
+    except AdmissionRejected as e:
+        logger.warning(f"Shedding prediction request: {e.reason}")
+        raise _shed(e)
+    except ClientDisconnected:
+        # Nobody is listening; skip the decode and inference entirely
+        logger.info("Client disconnected while queued, dropping prediction request")
+        raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail="Client closed request")
     except ValueError as e:
+        ERRORS.inc(type="prediction_failed")
         logger.error(f"Validation error: {str(e)}")
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
+        ERRORS.inc(type="internal")
         logger.error(f"Prediction error: {str(e)}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
 
-# The /model/info endpoint remains unchanged
+# Non-standard (nginx) status for a request the client abandoned; never actually seen by the client
+CLIENT_CLOSED_REQUEST = 499
+
+def _shed(error: AdmissionRejected) -> HTTPException:
+    return HTTPException(status_code=error.status_code, detail=error.detail, headers={"Retry-After": str(error.retry_after)})
+
+ZIP_CONTENT_TYPES = ("application/zip", "application/x-zip-compressed")
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+@router.post(
+    "/predict/batch",
+    response_model=BatchPredictionResponse,
+    responses={
+        400: {"model": ErrorResponse},
+        429: {"model": ErrorResponse},
+        500: {"model": ErrorResponse},
+        503: {"model": ErrorResponse}
+    },
+    summary="Predict age for many images",
+    description="Upload several images (or zip archives of images) and get one result per image. "
+                "If authenticated, successful results are saved to your history."
+)
+@instrument("predict_batch")
+async def predict_age_batch(
+    request: Request,
+    files: List[UploadFile] = File(..., description="Image files (JPEG, PNG, WebP) or .zip archives of them"),
+    current_user: Optional[UserPrincipal] = Depends(get_current_user_optional)
+):
+    """
+    Predicts ages for a batch of images in one decode pass and one model call.
+    Invalid or oversized items are reported individually instead of failing the whole batch.
+    Subject to the same rate limit and admission control as **/predict**.
+    """
+    try:
+        user_rate_limiter.check(current_user.email if current_user else None)
+    except AdmissionRejected as e:
+        raise _shed(e)
+
+    items: List[Tuple[str, Optional[bytes], Optional[str]]] = []
+    with STAGE_SECONDS.time(stage="upload_read"):
+        for file in files:
+            # One budget across all files, so no further member is inflated once the batch is over it
+            async for item in iter_upload(file, settings.MAX_BATCH_FILES - len(items)):
+                items.append(item)
+                if len(items) > settings.MAX_BATCH_FILES:
+                    ERRORS.inc(type="too_many_files")
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"Too many images. Maximum per batch: {settings.MAX_BATCH_FILES}"
+                    )
+
+    valid = [(index, content) for index, (_, content, error) in enumerate(items) if error is None]
+    try:
+        async with admission.admit(request):
+            predictions, model_version = await prediction_service.predict_batch([content for _, content in valid], current_user)
+    except AdmissionRejected as e:
+        logger.warning(f"Shedding batch prediction request: {e.reason}")
+        raise _shed(e)
+    except ClientDisconnected:
+        raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail="Client closed request")
+    except Exception as e:
+        ERRORS.inc(type="internal")
+        logger.error(f"Batch prediction error: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
+
+    results = [BatchPredictionItem(filename=filename, error=error) for filename, _, error in items]
+    for (index, _), prediction in zip(valid, predictions):
+        if isinstance(prediction, Exception):
+            results[index].error = str(prediction)
+        else:
+            results[index].age, confidence = prediction
+            results[index].confidence = round(confidence, 2)
+
+    failed = sum(1 for result in results if result.error is not None)
+    if failed:
+        ERRORS.inc(failed, type="batch_item")
+    return BatchPredictionResponse(results=results, succeeded=len(results) - failed, failed=failed, model_version=model_version)
+
+@router.post(
+    "/predict/tensor",
+    response_model=TensorPredictionResponse,
+    responses={
+        400: {"model": ErrorResponse},
+        413: {"model": ErrorResponse},
+        415: {"model": ErrorResponse},
+        429: {"model": ErrorResponse},
+        503: {"model": ErrorResponse}
+    },
+    summary="Predict age from pre-decoded pixels",
+    description="Send uint8 pixels at the model's input size instead of an encoded image, skipping server-side decoding."
+)
+@instrument("predict_tensor")
+async def predict_age_tensor(
+    request: Request,
+    current_user: Optional[UserPrincipal] = Depends(get_current_user_optional)
+):
+    """
+    Predicts ages for images the caller has already decoded and resized; the request
+    body is the pixels, not a multipart form. Either:
+    - **application/x-npy**: a .npy file of a C-order uint8 array shaped (H, W, 3) or (N, H, W, 3), or
+    - **application/octet-stream**: records of a little-endian uint32 byte count followed by one image's H x W x 3 bytes.
+
+    H and W must equal the model input size (see `/model/info`). Results are not saved to history.
+    """
+    try:
+        user_rate_limiter.check(current_user.email if current_user else None)
+    except AdmissionRejected as e:
+        raise _shed(e)
+
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    with STAGE_SECONDS.time(stage="upload_read"):
+        data = await request.body()
+    if content_type not in TENSOR_CONTENT_TYPES and not data.startswith(NPY_MAGIC):
+        ERRORS.inc(type="invalid_tensor")
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Unsupported content type. Supported types: {', '.join(TENSOR_CONTENT_TYPES)}"
+        )
+
+    try:
+        async with admission.admit(request):
+            results, model_version = await prediction_service.predict_tensor(data)
+    except AdmissionRejected as e:
+        logger.warning(f"Shedding tensor prediction request: {e.reason}")
+        raise _shed(e)
+    except ClientDisconnected:
+        raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail="Client closed request")
+    except ValueError as e:
+        ERRORS.inc(type="invalid_tensor")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        ERRORS.inc(type="internal")
+        logger.error(f"Tensor prediction error: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
+
+    return TensorPredictionResponse(
+        ages=[age for age, _ in results],
+        confidences=[round(confidence, 2) for _, confidence in results],
+        model_version=model_version,
+    )
+
+async def iter_upload(file: UploadFile, max_files: int = settings.MAX_BATCH_FILES) -> AsyncIterator[Tuple[str, Optional[bytes], Optional[str]]]:
+    """
+    Yields (filename, content, error) for an uploaded image, or for each image inside an
+    uploaded zip, one at a time. Zip members are read straight from the spooled upload,
+    so only the image being yielded is held in memory. The job API stores each one
+    before asking for the next.
+
+    `max_files` is what is left of the caller's budget: a zip yields at most
+    `max_files + 1` members, enough for the caller to see it went over and stop.
+    """
+    filename = file.filename or "upload"
+    is_zip = file.content_type in ZIP_CONTENT_TYPES or filename.lower().endswith(".zip")
+    if not is_zip:
+        try:
+            content = await read_upload_limited(file, settings.MAX_FILE_SIZE)
+        except UploadTooLargeError:
+            yield filename, None, "File too large"
+            return
+        yield filename, content, _validate_image_header(content)
+        return
+
+    # A zip may hold up to max_files images of MAX_FILE_SIZE each
+    size = file.file.seek(0, io.SEEK_END)
+    file.file.seek(0)
+    if size > settings.MAX_FILE_SIZE * max_files:
+        yield filename, None, "File too large"
+        return
+    try:
+        archive = await asyncio.to_thread(zipfile.ZipFile, file.file)
+    except zipfile.BadZipFile:
+        yield filename, None, "Invalid zip archive"
+        return
+    with archive:
+        members = [m for m in archive.infolist() if not m.is_dir() and m.filename.lower().endswith(IMAGE_EXTENSIONS)]
+        # Stop early rather than decompressing an archive that can't be accepted anyway
+        for member in members[:max_files + 1]:
+            name = f"{filename}/{member.filename}"
+            if not validate_file_size(member.file_size, settings.MAX_FILE_SIZE):
+                yield name, None, "File too large"
+                continue
+            member_content = await asyncio.to_thread(_read_member, archive, member, settings.MAX_FILE_SIZE)
+            if member_content is None:
+                yield name, None, "File too large"
+            else:
+                yield name, member_content, _validate_image_header(member_content)
+
+def _read_member(archive: zipfile.ZipFile, member: zipfile.ZipInfo, max_size: int) -> Optional[bytes]:
+    # The size in the zip directory isn't trusted: inflate at most one byte past the limit
+    with archive.open(member) as f:
+        content = f.read(max_size + 1)
+    return content if len(content) <= max_size else None
+
+def _validate_image_header(content: bytes) -> Optional[str]:
+    """Returns an error message if the bytes aren't a supported image of acceptable dimensions."""
+    header = sniff_image(content)
+    if header is None or not validate_image_format(header.content_type):
+        return "Invalid file type. Supported types: JPEG, PNG, WebP"
+    if header.width * header.height > settings.MAX_IMAGE_PIXELS:
+        return f"Image dimensions too large: {header.width}x{header.height}"
+    return None
+
+@router.websocket("/predict/stream")
+async def predict_stream(websocket: WebSocket, token: Optional[str] = Query(None)):
+    """
+    Live webcam predictions over one connection, authenticated once when it opens.
+
+    Authenticate with **?token=** (browsers can't set headers on a WebSocket) or an
+    Authorization header; without one the session is anonymous and can't capture.
+    - Send each frame as a binary message (JPEG, PNG or WebP). A frame that arrives
+      while the previous one is still waiting replaces it.
+    - Every scored frame is answered with
+      `{"type": "prediction", "frame", "age", "confidence", "smoothed_age", "smoothed_confidence", "model_version", "dropped", "latency_ms"}`.
+    - Send `{"type": "capture"}` to save the last scored frame with its smoothed
+      result to your history (`{"type": "captured", "id"}`), or `{"type": "reset"}`
+      to clear the smoothing window.
+    Problems with a single frame or message are reported as `{"type": "error", "detail"}`
+    and the stream carries on.
+    """
+    authorization = websocket.headers.get("authorization", "")
+    if token is None and authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    current_user = await get_current_user_optional(token) if token else None
+    if token and current_user is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    session = FrameSession(settings.STREAM_SMOOTHING_WINDOW)
+    # Results (scorer task) and command replies (this task) share the socket
+    send_lock = asyncio.Lock()
+
+    async def send(message: dict):
+        async with send_lock:
+            await websocket.send_json(message)
+
+    scorer = asyncio.create_task(_score_stream(session, send))
+    try:
+        with REQUESTS_IN_FLIGHT.track(endpoint="predict_stream"):
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                if message.get("bytes") is not None:
+                    if len(message["bytes"]) > settings.MAX_FILE_SIZE:
+                        STREAM_FRAMES.inc(result="invalid")
+                        await send({"type": "error", "detail": "Frame too large"})
+                    else:
+                        session.push(message["bytes"])
+                elif message.get("text") is not None:
+                    await send(_stream_command(message["text"], session, current_user))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        scorer.cancel()
+        try:
+            await scorer
+        except (asyncio.CancelledError, WebSocketDisconnect, RuntimeError):
+            # Cancelled mid-send, or the socket was already closed under it
+            pass
+    logger.info(f"Stream closed after {session.received} frames ({session.dropped} dropped)")
+
+async def _score_stream(session: FrameSession, send):
+    """Scores the newest frame whenever one is waiting, one at a time, and pushes the result."""
+    while True:
+        sequence, frame = await session.next_frame()
+        error = _validate_image_header(frame)
+        if error:
+            STREAM_FRAMES.inc(result="invalid")
+            await send({"type": "error", "frame": sequence, "detail": error})
+            continue
+        started = time.perf_counter()
+        try:
+            async with admission.admit():
+                age, confidence, model_version = await prediction_service.predict_frame(frame)
+        except AdmissionRejected as e:
+            # The next frame will be along shortly; just let the client know this one was skipped
+            STREAM_FRAMES.inc(result="busy")
+            await send({"type": "busy", "frame": sequence, "retry_after": e.retry_after})
+            continue
+        except ValueError as e:
+            STREAM_FRAMES.inc(result="invalid")
+            await send({"type": "error", "frame": sequence, "detail": str(e)})
+            continue
+        except Exception as e:
+            STREAM_FRAMES.inc(result="failed")
+            logger.error(f"Stream prediction error: {str(e)}")
+            await send({"type": "error", "frame": sequence, "detail": "Prediction failed"})
+            continue
+        STREAM_FRAMES.inc(result="scored")
+        smoothed_age, smoothed_confidence = session.observe(frame, age, confidence, model_version)
+        await send({
+            "type": "prediction",
+            "frame": sequence,
+            "age": age,
+            "confidence": round(confidence, 2),
+            "smoothed_age": smoothed_age,
+            "smoothed_confidence": round(smoothed_confidence, 2),
+            "model_version": model_version,
+            "dropped": session.dropped,
+            "latency_ms": round((time.perf_counter() - started) * 1000.0, 1),
+        })
+
+def _stream_command(text: str, session: FrameSession, current_user: Optional[UserPrincipal]) -> dict:
+    """Handles a JSON control message from a stream and returns the reply."""
+    try:
+        command = json.loads(text).get("type")
+    except (ValueError, AttributeError):
+        return {"type": "error", "detail": "Control messages must be JSON objects with a 'type'"}
+    if command == "reset":
+        session.reset()
+        return {"type": "reset"}
+    if command != "capture":
+        return {"type": "error", "detail": f"Unknown message type: {command}"}
+    if current_user is None:
+        return {"type": "error", "detail": "Authentication required to capture"}
+    if session.last_result is None:
+        return {"type": "error", "detail": "No frame has been scored yet"}
+    frame, smoothed_age, smoothed_confidence, model_version = session.last_result
+    item = user_service.add_prediction_to_history(current_user.email, frame, smoothed_age, smoothed_confidence, model_version)
+    return {"type": "captured", "id": str(item.id), "age": smoothed_age, "confidence": round(smoothed_confidence, 2)}
+
 @router.get("/model/info", summary="Get model information")
 async def get_model_info():
-    # ... (code for this endpoint is unchanged)
-    return {"model_path": settings.MODEL_PATH}
+    return {
+        "model_path": model_registry.path(),
+        "model": model_registry.info(),
+        "batching": prediction_service.batcher.stats(),
+        "admission": admission.stats(),
+        "cache": prediction_cache.stats(),
+    }
+
+@router.post("/model/reload", summary="Hot-reload the model", dependencies=[Depends(get_current_admin_user)])
+async def reload_model(reload_request: Optional[ModelReloadRequest] = None):
+    """
+    Loads and warms up the model file (the current one, or **path** inside the model
+    directory) in the background, then swaps it in without dropping requests.
+    Admin only. On failure the serving model is kept.
+    """
+    path = reload_request.path if reload_request else None
+    if path is not None:
+        model_dir = Path(settings.MODEL_PATH).resolve().parent
+        if model_dir not in Path(path).resolve().parents:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Model files must live in {model_dir}")
+    if model_registry.reloading:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="A model reload is already in progress")
+    try:
+        info = await asyncio.get_running_loop().run_in_executor(None, model_registry.reload, "default", path)
+    except Exception as e:
+        logger.error(f"Model reload failed: {e}")
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=f"Model reload failed: {e}")
+    return {"message": "Model reloaded", "model": info}
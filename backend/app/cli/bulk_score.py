@@ -0,0 +1,271 @@
+"""
+Offline bulk scoring over directories, globs and tar/zip archives.
+
+Images are read lazily, decoded in a process pool and scored in batches by the
+same model backend the API uses. Results are appended to CSV, JSONL or Parquet
+as each batch finishes, and a checkpoint file records finished inputs so an
+interrupted run can pick up where it stopped with --resume.
+
+Run from the backend directory:
+    python -m app.cli.bulk_score photos/ more/*.jpg archive.tar.gz -o results.csv --resume
+"""
+import argparse
+import csv
+import glob
+import json
+import logging
+import multiprocessing
+import os
+import tarfile
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Set, Tuple
+
+from app.core.config import settings
+from app.model.registry import model_registry
+from app.services.prediction_service import prediction_service
+# Workers import decode_chunk from preprocessing, which stays free of settings, Motor and the model
+from app.services.preprocessing import decode_chunk
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+RESULT_FIELDS = ["key", "age", "confidence", "error", "model_version"]
+
+
+# --- Input discovery (streaming) ---
+
+def iter_inputs(sources: List[str], skip: Set[str]) -> Iterator[Tuple[str, bytes]]:
+    """Yields (key, bytes) for every image under `sources`, reading one file at a time."""
+    for source in sources:
+        path = Path(source)
+        if path.is_dir():
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    yield from _read_file(Path(root) / name, skip)
+        elif path.is_file() and tarfile.is_tarfile(path):
+            yield from _iter_tar(path, skip)
+        elif path.is_file() and zipfile.is_zipfile(path):
+            yield from _iter_zip(path, skip)
+        elif path.is_file():
+            yield from _read_file(path, skip)
+        else:
+            for match in sorted(glob.iglob(source, recursive=True)):
+                yield from iter_inputs([match], skip)
+
+
+def _read_file(path: Path, skip: Set[str]) -> Iterator[Tuple[str, bytes]]:
+    key = str(path)
+    if path.suffix.lower() in IMAGE_EXTENSIONS and key not in skip:
+        yield key, path.read_bytes()
+
+
+def _member_key(path: Path, name: str, seen: Dict[str, int]) -> str:
+    """archive!member, plus #N on the Nth repeat of a name (tar and zip both allow repeats)."""
+    seen[name] = seen.get(name, 0) + 1
+    return f"{path}!{name}" if seen[name] == 1 else f"{path}!{name}#{seen[name]}"
+
+
+def _iter_tar(path: Path, skip: Set[str]) -> Iterator[Tuple[str, bytes]]:
+    seen: Dict[str, int] = {}
+    # Stream mode reads members sequentially without loading the index
+    with tarfile.open(path, "r|*") as archive:
+        for member in archive:
+            key = _member_key(path, member.name, seen)
+            if member.isfile() and member.name.lower().endswith(IMAGE_EXTENSIONS) and key not in skip:
+                yield key, archive.extractfile(member).read()
+
+
+def _iter_zip(path: Path, skip: Set[str]) -> Iterator[Tuple[str, bytes]]:
+    seen: Dict[str, int] = {}
+    with zipfile.ZipFile(path) as archive:
+        for member in archive.infolist():
+            key = _member_key(path, member.filename, seen)
+            if not member.is_dir() and member.filename.lower().endswith(IMAGE_EXTENSIONS) and key not in skip:
+                yield key, archive.read(member)
+
+
+# --- Output ---
+
+class ResultWriter:
+    """Appends result rows to CSV, JSONL or Parquet (Parquet needs pyarrow)."""
+
+    def __init__(self, path: Path, fmt: str, append: bool):
+        self.path = path
+        self.fmt = fmt
+        if fmt == "parquet":
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise SystemExit("Parquet output requires pyarrow: pip install pyarrow")
+            self._parquet = None
+            # Parquet files can't be appended to; a resumed run writes the next part file
+            if append and path.exists():
+                part = 1
+                while path.with_name(f"{path.stem}.part{part}{path.suffix}").exists():
+                    part += 1
+                self.path = path.with_name(f"{path.stem}.part{part}{path.suffix}")
+        else:
+            new_file = not (append and path.exists())
+            self._file = open(path, "a" if append else "w", newline="")
+            if fmt == "csv":
+                self._csv = csv.DictWriter(self._file, fieldnames=RESULT_FIELDS)
+                if new_file:
+                    self._csv.writeheader()
+
+    def write(self, rows: List[Dict]):
+        if self.fmt == "csv":
+            self._csv.writerows(rows)
+        elif self.fmt == "jsonl":
+            self._file.writelines(json.dumps(row) + "\n" for row in rows)
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pylist(rows, schema=pa.schema([
+                ("key", pa.string()), ("age", pa.int32()), ("confidence", pa.float32()),
+                ("error", pa.string()), ("model_version", pa.string()),
+            ]))
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.path, table.schema)
+            self._parquet.write_table(table)
+            return
+        self._file.flush()
+
+    def close(self):
+        if self.fmt == "parquet":
+            if self._parquet is not None:
+                self._parquet.close()
+        else:
+            self._file.close()
+
+
+class Checkpoint:
+    """
+    Keys of finished inputs, appended after their results are written. A crash can
+    at worst re-score the last batch; it never skips an unwritten one.
+    """
+
+    def __init__(self, path: Path, resume: bool):
+        self.path = path
+        self.done: Set[str] = set()
+        if resume and path.exists():
+            self.done = set(path.read_text().splitlines())
+        self._file = open(path, "a" if resume else "w")
+
+    def record(self, keys: List[str]):
+        self._file.writelines(key + "\n" for key in keys)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+# --- Pipeline ---
+
+@dataclass
+class Throughput:
+    images: int = 0
+    errors: int = 0
+    stage_seconds: Dict[str, float] = field(default_factory=lambda: {"read": 0.0, "decode": 0.0, "infer": 0.0, "write": 0.0})
+    started: float = field(default_factory=time.perf_counter)
+
+    def report(self) -> str:
+        wall = time.perf_counter() - self.started
+        rate = self.images / wall if wall else 0.0
+        stages = ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in self.stage_seconds.items())
+        return f"{self.images} images ({self.errors} errors) in {wall:.1f}s = {rate:.1f} images/sec | {stages}"
+
+
+def _chunks(items: Iterator[Tuple[str, bytes]], size: int, stats: Throughput) -> Iterator[List[Tuple[str, bytes]]]:
+    while True:
+        started = time.perf_counter()
+        chunk = []
+        for item in items:
+            chunk.append(item)
+            if len(chunk) == size:
+                break
+        stats.stage_seconds["read"] += time.perf_counter() - started
+        if not chunk:
+            return
+        yield chunk
+
+
+def run(sources: List[str], output: Path, fmt: str, batch_size: int, workers: int, resume: bool, report_every: int):
+    checkpoint = Checkpoint(output.with_name(output.name + ".checkpoint"), resume)
+    writer = ResultWriter(output, fmt, append=resume)
+    stats = Throughput()
+    backend_version = model_registry.version()
+    target_size = (settings.MODEL_INPUT_SIZE, settings.MODEL_INPUT_SIZE)
+    if checkpoint.done:
+        logger.info(f"Resuming: skipping {len(checkpoint.done)} already scored inputs")
+
+    # At most two chunks per worker are in flight, so memory stays bounded however large the input is
+    pending = deque()
+    batches = 0
+    try:
+        # Spawned, not forked: the parent already holds an initialized TensorFlow runtime
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            for chunk in _chunks(iter_inputs(sources, checkpoint.done), batch_size, stats):
+                pending.append(pool.submit(decode_chunk, chunk, target_size))
+                if len(pending) >= workers * 2:
+                    _score(pending.popleft().result(), writer, checkpoint, stats, backend_version)
+                    batches += 1
+                    if report_every and batches % report_every == 0:
+                        logger.info(stats.report())
+            while pending:
+                _score(pending.popleft().result(), writer, checkpoint, stats, backend_version)
+    finally:
+        writer.close()
+        checkpoint.close()
+    logger.info(f"Done. {stats.report()}")
+
+
+def _score(decode_result, writer: ResultWriter, checkpoint: Checkpoint, stats: Throughput, model_version: str):
+    decoded, decode_seconds = decode_result
+    stats.stage_seconds["decode"] += decode_seconds
+
+    # One row per decoded input, by position, so inputs sharing a key (overlapping sources) each keep theirs
+    rows = [{"key": key, "age": None, "confidence": None, "error": error, "model_version": model_version}
+            for key, _, error in decoded]
+    valid = [(i, pixels) for i, (_, pixels, error) in enumerate(decoded) if error is None]
+    if valid:
+        started = time.perf_counter()
+        for (i, _), (age, confidence) in zip(valid, prediction_service.predict_decoded([p for _, p in valid])):
+            rows[i]["age"] = age
+            rows[i]["confidence"] = round(confidence, 4)
+        stats.stage_seconds["infer"] += time.perf_counter() - started
+
+    started = time.perf_counter()
+    writer.write(rows)
+    checkpoint.record([row["key"] for row in rows])
+    stats.stage_seconds["write"] += time.perf_counter() - started
+
+    stats.images += len(rows)
+    stats.errors += len(rows) - len(valid)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("sources", nargs="+", help="Directories, image files, globs, or .tar/.tar.gz/.zip archives")
+    parser.add_argument("-o", "--output", required=True, type=Path, help="Result file (.csv, .jsonl or .parquet)")
+    parser.add_argument("--format", choices=["csv", "jsonl", "parquet"], help="Defaults to the output file's extension")
+    parser.add_argument("--batch-size", type=int, default=settings.BATCH_MAX_SIZE)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Decoding processes")
+    parser.add_argument("--resume", action="store_true", help="Skip inputs recorded in the checkpoint and append results")
+    parser.add_argument("--report-every", type=int, default=50, help="Log throughput every N batches (0 = only at the end)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    fmt = args.format or args.output.suffix.lstrip(".").lower()
+    if fmt not in ("csv", "jsonl", "parquet"):
+        parser.error("Cannot infer the output format; pass --format")
+    run(args.sources, args.output, fmt, max(1, args.batch_size), max(1, args.workers), args.resume, args.report_every)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Job workers for the asynchronous scoring API (/api/v1/jobs).
+
+Each worker process connects to MongoDB, loads and warms the model once, and
+processes up to --concurrency jobs at a time with the same batched inference the
+API uses. The queue lives in MongoDB, so workers can be started, stopped or killed
+at any time: a job held by a worker that dies is picked up again by another once
+its lease (JOB_LEASE_SECONDS) expires, resuming after the last recorded chunk.
+
+Run from the backend directory:
+    python -m app.cli.job_worker --workers 2
+"""
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import signal
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+async def _serve(concurrency: int):
+    from app.core.executors import executors
+    from app.db.database import mongodb
+    from app.model.registry import model_registry
+    from app.services.job_queue import job_queue
+    from app.services.job_worker import JobWorker
+
+    await mongodb.connect()
+    if mongodb.db is None:
+        raise SystemExit("❌ Job workers need MongoDB")
+    await job_queue.ensure_indexes()
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, model_registry.get)
+
+    stopping = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+    worker = JobWorker(concurrency)
+    worker.start()
+    await stopping.wait()
+    logger.info(f"Stopping job worker {worker.worker_id}")
+    await worker.stop()
+    executors.shutdown()
+    mongodb.close()
+
+
+def run_worker(concurrency: int):
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(processName)s %(message)s")
+    asyncio.run(_serve(concurrency))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=settings.JOB_WORKERS, help="Worker processes")
+    parser.add_argument("--concurrency", type=int, default=settings.JOB_WORKER_CONCURRENCY, help="Jobs per process at a time")
+    args = parser.parse_args()
+
+    workers = max(1, args.workers)
+    if workers == 1:
+        run_worker(args.concurrency)
+        return
+    # Spawned so each process initializes its own TensorFlow runtime and Mongo client
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=run_worker, args=(args.concurrency,), name=f"job-worker-{i}") for i in range(workers)]
+    for process in processes:
+        process.start()
+    print(f"✅ Started {workers} job workers")
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        # The children got the same SIGINT and are handing their jobs back
+        for process in processes:
+            process.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""
+Recomputes the per-user prediction stats served by /api/v1/history/stats.
+
+The stats are kept up to date incrementally as history is written and deleted;
+this rebuilds them from the history collection with an aggregation pipeline, for
+when they have drifted (manual edits, a crash between the two writes) or after
+STATS_AGE_BUCKET_WIDTH changed.
+
+Run from the backend directory:
+    python -m app.cli.rebuild_stats [--email user@example.com]
+"""
+import argparse
+import asyncio
+
+
+async def _rebuild(email: str = None) -> int:
+    from app.db.database import mongodb
+    from app.services.history_stats import history_stats
+
+    await mongodb.connect()
+    if mongodb.db is None:
+        raise SystemExit("❌ Rebuilding stats needs MongoDB")
+    try:
+        return await history_stats.rebuild(email)
+    finally:
+        mongodb.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--email", help="Only rebuild this user's stats")
+    args = parser.parse_args()
+
+    users = asyncio.run(_rebuild(args.email))
+    print(f"✅ Rebuilt stats for {users} user{'s' if users != 1 else ''}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Production entry point: several uvicorn worker processes sharing one copy of the model.
+
+The parent converts the Keras model to a TFLite flatbuffer once, in a spawned helper
+so the parent itself never initializes TensorFlow, checks it against Keras, and starts
+the workers with MODEL_PATH pointing at the .tflite file. Every worker memory-maps
+that file, so the weights sit in the page cache once rather than once per worker,
+and no worker loads Keras at all. CPU threads are split between the workers so N
+processes don't each size their thread pools for the whole machine.
+
+Run from the backend directory:
+    python -m app.cli.serve --workers 4
+    python -m app.cli.serve --export-only   # convert a new model, then POST /api/v1/model/reload with its path
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def build_shared_model(model_path: str, output_dir: str, quantize: bool, input_size: int, tolerance: float) -> str:
+    """Exports the .tflite file and verifies it against Keras; runs in a spawned process."""
+    import numpy as np
+
+    from app.model.backends import KerasBackend, TFLiteBackend, check_parity, export_tflite
+    from app.model.loader import load_model
+
+    artifact = export_tflite(model_path, output_dir, quantize)
+    sample = np.random.default_rng(0).random((4, input_size, input_size, 3), dtype=np.float32)
+    diff = check_parity(KerasBackend(load_model(model_path, fallback=False)), TFLiteBackend(None, model_path=artifact), sample, tolerance)
+    logger.info(f"Shared model {artifact} matches Keras (max abs diff {diff:.4f})")
+    return artifact
+
+
+def prepare_shared_model() -> str:
+    """Returns the model file workers should load: the shared .tflite file, or MODEL_PATH if it can't be built."""
+    model_path = settings.MODEL_PATH
+    if model_path.endswith(".tflite"):
+        return model_path
+    if not Path(model_path).exists():
+        logger.warning(f"Model file not found at {model_path}; workers will use the mock model")
+        return model_path
+    try:
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            return pool.submit(
+                build_shared_model, model_path, settings.SHARED_MODEL_DIR, settings.TFLITE_QUANTIZE,
+                settings.MODEL_INPUT_SIZE, settings.BACKEND_PARITY_TOLERANCE,
+            ).result()
+    except Exception as e:
+        logger.error(f"Could not build the shared TFLite model ({e}); each worker will load {model_path} itself")
+        return model_path
+
+
+def worker_environment(workers: int, cpus: int, model_path: str) -> Dict[str, str]:
+    """
+    Settings for the worker processes. Anything configured explicitly (environment
+    or .env) is left alone; only defaults are replaced.
+    """
+    threads = max(1, cpus // workers)
+    tuned = {
+        "MODEL_LOAD_MODE": "eager",  # a worker accepts requests only once its model is warm
+        "TF_INTRA_OP_THREADS": threads,
+        "TF_INTER_OP_THREADS": 1,
+        "TFLITE_NUM_THREADS": threads,
+        # Decoding shares the worker's cores; threads avoid a second set of processes per worker
+        "PREPROCESS_EXECUTOR": "thread",
+        "PREPROCESS_WORKERS": threads,
+        # Keep the total number of Mongo connections where a single process would have it
+        "MONGODB_MAX_POOL_SIZE": max(10, settings.MONGODB_MAX_POOL_SIZE // workers),
+    }
+    env = {name: str(value) for name, value in tuned.items() if name not in settings.__fields_set__}
+    env["MODEL_PATH"] = model_path
+    # Native libraries (OpenMP/MKL) read this one straight from the environment
+    if "OMP_NUM_THREADS" not in os.environ:
+        env["OMP_NUM_THREADS"] = str(threads)
+    return env
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=settings.SERVE_WORKERS)
+    parser.add_argument("--host", default=settings.HOST)
+    parser.add_argument("--port", type=int, default=settings.PORT)
+    parser.add_argument("--export-only", action="store_true", help="Build the shared .tflite file, print its path and exit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    model_path = prepare_shared_model()
+    if args.export_only:
+        print(f"✅ Shared model: {model_path}")
+        return
+
+    workers = max(1, args.workers)
+    env = worker_environment(workers, os.cpu_count() or 1, model_path)
+    # Uvicorn spawns its workers, which read their settings from this environment
+    os.environ.update(env)
+    logger.info(f"Starting {workers} workers serving {model_path} with {env.get('TFLITE_NUM_THREADS', 'default')} threads each")
+
+    import uvicorn
+    uvicorn.run("app.main:app", host=args.host, port=args.port, workers=workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+import asyncio
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Deque, Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import ADMISSIONS, STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejected(Exception):
+    """A request turned away before doing any work; maps to an HTTP error with Retry-After."""
+
+    def __init__(self, reason: str, status_code: int, retry_after: float, detail: str):
+        super().__init__(detail)
+        self.reason = reason
+        self.status_code = status_code
+        self.detail = detail
+        # Whole seconds, as the header requires, and never 0 so clients actually back off
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class ClientDisconnected(Exception):
+    """The client went away while its request waited for a slot."""
+
+
+class AdmissionController:
+    """
+    Bounds how many requests are being decoded and scored at once.
+
+    Up to `max_concurrent` requests run; the next `max_queue` wait in FIFO order for
+    at most `max_wait_ms`. Anything beyond that is rejected immediately, so under
+    overload clients get a fast 503 instead of a response that arrives after they
+    gave up. Retry-After is estimated from the recent per-request service time.
+    """
+
+    def __init__(self, max_concurrent: int, max_queue: int, max_wait_ms: float):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max(0, max_queue)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        # Moving average of how long an admitted request holds its slot
+        self._service_time = 0.05
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_concurrent > 0
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(1 for waiter in self._waiters if not waiter.done())
+
+    @asynccontextmanager
+    async def admit(self, request=None):
+        """
+        Holds a slot for the duration of the block; raises AdmissionRejected if none frees
+        up in time. With the Starlette `request`, raises ClientDisconnected instead of
+        running the block if the client hung up while queued.
+        """
+        if self.enabled:
+            started = time.perf_counter()
+            await self._acquire()
+            STAGE_SECONDS.observe(time.perf_counter() - started, stage="admission_wait")
+        admitted = time.perf_counter()
+        try:
+            if request is not None and await request.is_disconnected():
+                ADMISSIONS.inc(result="disconnected")
+                raise ClientDisconnected()
+            ADMISSIONS.inc(result="admitted")
+            yield
+        finally:
+            if self.enabled:
+                self._service_time = 0.9 * self._service_time + 0.1 * (time.perf_counter() - admitted)
+                self._release()
+
+    async def _acquire(self):
+        if self._active < self.max_concurrent and not self._waiters:
+            self._active += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            ADMISSIONS.inc(result="queue_full")
+            raise AdmissionRejected("queue_full", 503, self.retry_after(), "Server is at capacity, try again later")
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.max_wait)
+        except asyncio.TimeoutError:
+            ADMISSIONS.inc(result="queue_timeout")
+            raise AdmissionRejected("queue_timeout", 503, self.retry_after(), "Server is at capacity, try again later")
+        except BaseException:
+            # Cancelled just as a slot was handed over: pass it on rather than leak it
+            if waiter.done() and not waiter.cancelled():
+                self._release()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def _release(self):
+        # Hand the slot straight to the oldest waiter still waiting, so it can't be overtaken
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._active -= 1
+
+    def retry_after(self) -> float:
+        """Seconds until the current queue has likely drained."""
+        return (self.queue_depth + 1) * self._service_time / max(1, self.max_concurrent)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "active": self._active,
+            "queue_depth": self.queue_depth,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "avg_service_ms": round(self._service_time * 1000.0, 2),
+        }
+
+
+class TokenBucketLimiter:
+    """
+    Per-key token buckets: each key may make `burst` requests at once and
+    `rate_per_second` on average. Buckets of the least recently seen keys are
+    dropped once `max_keys` is reached; a dropped key simply starts full again.
+    """
+
+    def __init__(self, rate_per_second: float, burst: int, max_keys: int):
+        self.rate = rate_per_second
+        self.burst = max(1, burst)
+        self.max_keys = max(1, max_keys)
+        # key -> (tokens, last refill time)
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def acquire(self, key: str) -> float:
+        """Takes one token for `key`. Returns 0 if allowed, else the seconds until a token is available."""
+        if not self.enabled:
+            return 0.0
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(key, (float(self.burst), now))
+            tokens = min(float(self.burst), tokens + (now - last) * self.rate)
+            if tokens >= 1.0:
+                tokens -= 1.0
+                wait = 0.0
+            else:
+                wait = (1.0 - tokens) / self.rate
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def check(self, key: Optional[str]):
+        """Raises AdmissionRejected (429) if `key` is out of tokens; anonymous requests (None) aren't limited."""
+        if key is None:
+            return
+        wait = self.acquire(key)
+        if wait > 0:
+            ADMISSIONS.inc(result="rate_limited")
+            raise AdmissionRejected("rate_limited", 429, wait, "Rate limit exceeded, slow down")
+
+
+# Singleton instances guarding /predict
+admission = AdmissionController(settings.ADMISSION_MAX_CONCURRENT, settings.ADMISSION_MAX_QUEUE, settings.ADMISSION_MAX_WAIT_MS)
+user_rate_limiter = TokenBucketLimiter(settings.USER_RATE_LIMIT_PER_SECOND, settings.USER_RATE_LIMIT_BURST, settings.USER_RATE_LIMIT_MAX_USERS)
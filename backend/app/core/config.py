@@ -1,5 +1,5 @@
 from pydantic import BaseSettings
-from typing import List
+from typing import List, Optional
 
 class Settings(BaseSettings):
     # Application
@@ -10,6 +10,7 @@ class Settings(BaseSettings):
     # Server
     HOST: str = "0.0.0.0"
     PORT: int = 8000
+    SERVE_WORKERS: int = 2  # worker processes started by `python -m app.cli.serve`
     
     # CORS
     ALLOWED_ORIGINS: List[str] = ["http://localhost:3000", "http://127.0.0.1:3000"]
@@ -17,13 +18,104 @@ class Settings(BaseSettings):
     # Model
     MODEL_PATH: str = "app/model/age_predictor.h5"
     MAX_FILE_SIZE: int = 10485760  # 10MB
+    MAX_BATCH_FILES: int = 64
+    MAX_IMAGE_PIXELS: int = 40_000_000  # reject larger images (decompression bombs) before decoding
+    MODEL_INPUT_SIZE: int = 64
+    MODEL_LOAD_MODE: str = "lazy"  # "lazy" (first request) or "eager" (app startup)
+    MODEL_WARMUP: bool = True
+    MODEL_WATCH_INTERVAL_SECONDS: float = 0  # poll MODEL_PATH and hot-reload on change; 0 disables
+    
+    # Inference Backend
+    INFERENCE_BACKEND: str = "keras"  # "keras", "compiled" (tf.function) or "tflite"
+    TFLITE_QUANTIZE: bool = False
+    TFLITE_NUM_THREADS: Optional[int] = None
+    TF_INTRA_OP_THREADS: Optional[int] = None  # per process; `app.cli.serve` sets cores / workers
+    TF_INTER_OP_THREADS: Optional[int] = None
+    SHARED_MODEL_DIR: str = "data/models"  # where `app.cli.serve` writes the shared .tflite conversion
+    BACKEND_PARITY_CHECK: bool = True
+    BACKEND_PARITY_TOLERANCE: float = 1.0  # max absolute difference in predicted years
+
+    # Mock Model (used when MODEL_PATH doesn't exist); per-call cost = base + per_image * batch ** exponent
+    MOCK_MODEL_BASE_MS: float = 0.0
+    MOCK_MODEL_PER_IMAGE_MS: float = 0.0
+    MOCK_MODEL_BATCH_EXPONENT: float = 1.0
+    MOCK_MODEL_COST_MODE: str = "sleep"  # "sleep" (releases the GIL) or "compute" (burns CPU)
+    
+    # Inference Batching
+    BATCH_MAX_SIZE: int = 32
+    BATCH_MAX_WAIT_MS: float = 5.0
+    
+    # Executors (CPU-bound work off the event loop)
+    PREPROCESS_EXECUTOR: str = "process"  # "process" or "thread"
+    PREPROCESS_WORKERS: int = 2
+    INFERENCE_WORKERS: int = 1
+    MAX_INFLIGHT_PREDICTIONS: int = 64
+
+    # Admission Control (/predict): shed load with 503/429 + Retry-After instead of queueing without bound
+    ADMISSION_MAX_CONCURRENT: int = 32  # requests decoding/scoring at once; 0 disables admission control
+    ADMISSION_MAX_QUEUE: int = 64  # requests allowed to wait for a slot
+    ADMISSION_MAX_WAIT_MS: float = 1000.0  # longest a request waits for a slot before a 503
+    USER_RATE_LIMIT_PER_SECOND: float = 0  # per-user token bucket keyed by the JWT subject; 0 disables
+    USER_RATE_LIMIT_BURST: int = 10
+    USER_RATE_LIMIT_MAX_USERS: int = 10000
+
+    # Job Queue (/jobs): large scoring jobs processed outside the request
+    JOB_MAX_IMAGES: int = 5000
+    JOB_MAX_UPLOAD_BYTES: int = 536870912  # 512MB per submission
+    JOB_MAX_QUEUED_PER_USER: int = 20  # unfinished jobs a user may have
+    JOB_MAX_RUNNING_PER_USER: int = 1  # jobs of one user processed at the same time
+    JOB_LEASE_SECONDS: int = 60  # a job whose worker stops renewing for this long is retried
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_RETRY_BACKOFF_SECONDS: float = 10.0  # multiplied by the attempt number
+    JOB_POLL_INTERVAL_SECONDS: float = 1.0  # idle workers and long-polling clients check this often
+    JOB_LONG_POLL_MAX_SECONDS: int = 30
+    JOB_RESULT_TTL_SECONDS: int = 604800  # finished jobs are deleted after 7 days
+    JOB_WORKERS: int = 1  # processes started by `python -m app.cli.job_worker`
+    JOB_WORKER_CONCURRENCY: int = 1  # jobs per worker process at a time
+    JOB_EMBEDDED_WORKERS: int = 0  # jobs each API process works on itself; 0 leaves them to app.cli.job_worker
+
+    # Webcam Streaming (WebSocket /predict/stream)
+    STREAM_SMOOTHING_WINDOW: int = 5  # scored frames in the rolling median
+    
+    # Prediction Cache
+    PREDICTION_CACHE_ENABLED: bool = True
+    PREDICTION_CACHE_MAX_ENTRIES: int = 10000
+    PREDICTION_CACHE_TTL_SECONDS: int = 3600
+    PREDICTION_CACHE_SHARED: bool = False  # also cache in MongoDB so hits work across workers
     
     # --- New Database and Auth Settings ---
     MONGODB_URL: str
     DB_NAME: str = "AgePredictionDB"
+    MONGODB_MAX_POOL_SIZE: int = 100
+    MONGODB_MIN_POOL_SIZE: int = 0
+    MONGODB_CONNECT_TIMEOUT_MS: int = 5000
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS: int = 5000
+    MONGODB_SOCKET_TIMEOUT_MS: Optional[int] = None
     SECRET_KEY: str
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60  # upper bound on how long a user disabled in the database can still authenticate
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = 10000
+    TOKEN_CACHE_TTL_SECONDS: int = 300  # verified tokens are also never cached past their exp
+    TOKEN_CACHE_MAX_ENTRIES: int = 10000
+    PASSWORD_HASH_WORKERS: int = 2  # threads running bcrypt, i.e. the concurrent login cap
+    PASSWORD_HASH_MAX_PENDING: int = 32  # logins allowed to wait for a worker before 503s
+    
+    # History Storage
+    HISTORY_BLOB_STORE: str = "gridfs"  # "gridfs" or "local"
+    BLOB_STORE_DIR: str = "data/blobs"
+    THUMBNAIL_SIZE: int = 128
+    HISTORY_IMAGE_FORMAT: str = "webp"  # "webp" or "jpeg"; history images and thumbnails are re-encoded to it
+    HISTORY_IMAGE_MAX_SIZE: int = 1024  # longest side of a stored history image, in pixels
+    HISTORY_IMAGE_QUALITY: int = 80
+    HISTORY_FLUSH_INTERVAL_MS: int = 200
+    HISTORY_FLUSH_BATCH_SIZE: int = 100
+    STATS_AGE_BUCKET_WIDTH: int = 10  # years per age histogram bucket; run `python -m app.cli.rebuild_stats` after changing it
+
+    # Observability
+    METRICS_ENABLED: bool = True  # serve Prometheus metrics at /metrics
+    PROFILING_ENABLED: bool = False  # admin-only /debug/profile; never leave on in production
+    PROFILE_MAX_SECONDS: int = 60
     
     class Config:
         env_file = ".env"
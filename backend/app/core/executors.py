@@ -0,0 +1,114 @@
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+from typing import Callable, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class HashingBusyError(RuntimeError):
+    """Raised when too many password hashing calls are already waiting for a worker."""
+
+
+class ExecutorPool:
+    """
+    Keeps CPU-bound work off the asyncio event loop.
+
+    Image decoding runs in a process (or thread) pool, model inference in a
+    dedicated thread pool, and an in-flight limit provides back-pressure so
+    queued work cannot grow without bound. bcrypt gets its own small pool so a
+    burst of logins can only ever occupy PASSWORD_HASH_WORKERS cores.
+
+    Decode processes are spawned, never forked: by the time they start, this process
+    holds an initialized TensorFlow runtime and running inference threads. A pool
+    whose worker died (e.g. OOM-killed on a huge image) is replaced on next use.
+    """
+
+    def __init__(self):
+        self._preprocess: Optional[Executor] = None
+        self._inference: Optional[Executor] = None
+        self._hashing: Optional[Executor] = None
+        self._hashing_pending = 0
+        self._inflight: Optional[asyncio.Semaphore] = None
+        self._inflight_loop = None
+
+    @property
+    def preprocess_executor(self) -> Executor:
+        if self._preprocess is None:
+            workers = settings.PREPROCESS_WORKERS
+            if settings.PREPROCESS_EXECUTOR == "process":
+                self._preprocess = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            else:
+                self._preprocess = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="preprocess")
+            logger.info(f"Started {settings.PREPROCESS_EXECUTOR} preprocessing pool with {workers} workers")
+        return self._preprocess
+
+    @property
+    def inference_executor(self) -> Executor:
+        if self._inference is None:
+            # Threads, not processes: the model lives in this process' memory
+            self._inference = ThreadPoolExecutor(max_workers=settings.INFERENCE_WORKERS, thread_name_prefix="inference")
+        return self._inference
+
+    @property
+    def hashing_executor(self) -> Executor:
+        if self._hashing is None:
+            # bcrypt releases the GIL while hashing, so threads run it in parallel
+            self._hashing = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="hashing")
+        return self._hashing
+
+    def start(self):
+        """Creates the pools up front; called from the lifespan before the model loads."""
+        self.preprocess_executor
+        self.inference_executor
+
+    async def run_preprocess(self, fn: Callable, *args):
+        executor = self.preprocess_executor
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+        except BrokenProcessPool:
+            # This task is lost, but later ones get a fresh pool instead of failing until restart
+            if self._preprocess is executor:
+                logger.error("A preprocessing worker died; replacing the pool")
+                self._preprocess = None
+                executor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    async def run_inference(self, fn: Callable, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.inference_executor, fn, *args)
+
+    async def run_hashing(self, fn: Callable, *args):
+        """Runs password hashing/verification, failing fast once the wait queue is full."""
+        if self._hashing_pending >= settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_MAX_PENDING:
+            raise HashingBusyError("Too many password checks in progress")
+        self._hashing_pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.hashing_executor, fn, *args)
+        finally:
+            self._hashing_pending -= 1
+
+    @asynccontextmanager
+    async def inflight(self):
+        """Bounds the number of predictions being processed concurrently."""
+        loop = asyncio.get_running_loop()
+        if self._inflight is None or self._inflight_loop is not loop:
+            self._inflight = asyncio.Semaphore(settings.MAX_INFLIGHT_PREDICTIONS)
+            self._inflight_loop = loop
+        async with self._inflight:
+            yield
+
+    def shutdown(self):
+        for executor in (self._preprocess, self._inference, self._hashing):
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
+        self._preprocess = None
+        self._inference = None
+        self._hashing = None
+
+# Singleton instance
+executors = ExecutorPool()
@@ -3,14 +3,20 @@ from fastapi.security import OAuth2PasswordBearer
 from typing import Optional
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
+import hashlib
+import time
 
+from app.core.cache import TTLCache
 from app.core.config import settings
-from app.schemas.user_schemas import TokenData, UserInDB
+from app.schemas.user_schemas import TokenData, UserPrincipal
 from app.services.user_service import user_service
 
 # OAuth2 Scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/v1/auth/token", auto_error=False)
 
+# Subjects of tokens whose signature already checked out, keyed by the token's digest
+verified_tokens = TTLCache(settings.TOKEN_CACHE_MAX_ENTRIES, settings.TOKEN_CACHE_TTL_SECONDS)
+
 def create_access_token(data: dict) -> str:
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -18,10 +24,30 @@ def create_access_token(data: dict) -> str:
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
     return encoded_jwt
 
-async def get_current_user_optional(token: Optional[str] = Depends(oauth2_scheme)) -> Optional[UserInDB]:
-    # ... (this function remains unchanged)
+async def get_current_user_optional(token: Optional[str] = Depends(oauth2_scheme)) -> Optional[UserPrincipal]:
+    """
+    Resolves the bearer token to a lightweight principal (cached), or None if absent or invalid.
+    """
     if token is None:
         return None
+    email = _verify_token(token)
+    if email is None:
+        return None
+    user = await user_service.get_principal(email=email)
+    if user is None or user.disabled:
+        return None
+    return user
+
+def _verify_token(token: str) -> Optional[str]:
+    """
+    Returns the token's subject if its signature and expiry check out. Verified tokens
+    are cached until the earlier of their exp and TOKEN_CACHE_TTL_SECONDS, so repeat
+    requests skip signature verification.
+    """
+    key = hashlib.sha256(token.encode()).hexdigest()
+    email = verified_tokens.get(key)
+    if email is not None:
+        return email
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
         email: str = payload.get("sub")
@@ -29,11 +55,15 @@ async def get_current_user_optional(token: Optional[str] = Depends(oauth2_scheme
         token_data = TokenData(email=email)
     except JWTError:
         return None
-    user = user_service.get_user_by_email(email=token_data.email)
-    return user
+    ttl = settings.TOKEN_CACHE_TTL_SECONDS
+    if payload.get("exp") is not None:
+        ttl = min(ttl, payload["exp"] - time.time())
+    if ttl > 0:
+        verified_tokens.set(key, token_data.email, ttl_seconds=ttl)
+    return token_data.email
 
 # --- New Required Dependency ---
-async def get_current_active_user(token: str = Depends(oauth2_scheme)) -> UserInDB:
+async def get_current_active_user(token: str = Depends(oauth2_scheme)) -> UserPrincipal:
     """
     Dependency to get the current user. Raises HTTP 401 if not authenticated.
     """
@@ -52,6 +82,14 @@ async def get_current_active_user(token: str = Depends(oauth2_scheme)) -> UserIn
         )
     return user
 
+async def get_current_admin_user(user: UserPrincipal = Depends(get_current_active_user)) -> UserPrincipal:
+    """
+    Dependency for operational endpoints. Raises HTTP 403 unless the user is an admin.
+    """
+    if not user.is_admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin privileges required")
+    return user
+
 # --- Existing Validation Functions ---
 def validate_file_size(file_size: int, max_size: int) -> bool:
     return file_size <= max_size
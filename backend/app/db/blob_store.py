@@ -0,0 +1,157 @@
+import asyncio
+import os
+import logging
+from pathlib import Path
+from typing import AsyncIterator, Optional
+from uuid import uuid4
+
+from app.core.config import settings
+from app.db.database import mongodb
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 256 * 1024
+
+
+class BlobStore:
+    """Stores opaque binary blobs (history images, thumbnails) outside user documents."""
+
+    def new_id(self) -> str:
+        """Allocates an id up front so references can be recorded before the bytes are written."""
+        raise NotImplementedError
+
+    async def put(self, data: bytes, blob_id: Optional[str] = None) -> str:
+        raise NotImplementedError
+
+    async def get(self, blob_id: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    async def stream(self, blob_id: str, chunk_size: int = CHUNK_SIZE) -> Optional[AsyncIterator[bytes]]:
+        """Returns an async iterator over the blob's bytes, or None if it doesn't exist."""
+        raise NotImplementedError
+
+    async def delete(self, blob_id: str):
+        raise NotImplementedError
+
+
+class GridFSBlobStore(BlobStore):
+    def __init__(self):
+        self._bucket = None
+        self._bucket_db = None
+
+    @property
+    def bucket(self):
+        # Bound lazily: the database only exists once the lifespan has connected
+        if self._bucket is None or self._bucket_db is not mongodb.db:
+            from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+            self._bucket = AsyncIOMotorGridFSBucket(mongodb.db, bucket_name="images")
+            self._bucket_db = mongodb.db
+        return self._bucket
+
+    def new_id(self) -> str:
+        from bson import ObjectId
+        return str(ObjectId())
+
+    async def put(self, data: bytes, blob_id: Optional[str] = None) -> str:
+        from bson import ObjectId
+        blob_id = blob_id or self.new_id()
+        await self.bucket.upload_from_stream_with_id(ObjectId(blob_id), blob_id, data)
+        return blob_id
+
+    async def get(self, blob_id: str) -> Optional[bytes]:
+        from bson import ObjectId
+        from gridfs.errors import NoFile
+        try:
+            grid_out = await self.bucket.open_download_stream(ObjectId(blob_id))
+        except NoFile:
+            return None
+        return await grid_out.read()
+
+    async def stream(self, blob_id: str, chunk_size: int = CHUNK_SIZE) -> Optional[AsyncIterator[bytes]]:
+        from bson import ObjectId
+        from gridfs.errors import NoFile
+        try:
+            grid_out = await self.bucket.open_download_stream(ObjectId(blob_id))
+        except NoFile:
+            return None
+
+        async def chunks():
+            while True:
+                chunk = await grid_out.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        return chunks()
+
+    async def delete(self, blob_id: str):
+        from bson import ObjectId
+        from gridfs.errors import NoFile
+        try:
+            await self.bucket.delete(ObjectId(blob_id))
+        except NoFile:
+            pass
+
+
+class LocalBlobStore(BlobStore):
+    """Blobs as files under `root`, sharded by the first two characters of the id. File I/O runs in threads."""
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+
+    def _path(self, blob_id: str) -> Path:
+        if not blob_id.isalnum():
+            raise ValueError(f"Invalid blob id: {blob_id}")
+        return self.root / blob_id[:2] / blob_id
+
+    def new_id(self) -> str:
+        return uuid4().hex
+
+    def _write(self, path: Path, data: bytes):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+
+    async def put(self, data: bytes, blob_id: Optional[str] = None) -> str:
+        blob_id = blob_id or self.new_id()
+        await asyncio.to_thread(self._write, self._path(blob_id), data)
+        return blob_id
+
+    async def get(self, blob_id: str) -> Optional[bytes]:
+        try:
+            return await asyncio.to_thread(self._path(blob_id).read_bytes)
+        except FileNotFoundError:
+            return None
+
+    async def stream(self, blob_id: str, chunk_size: int = CHUNK_SIZE) -> Optional[AsyncIterator[bytes]]:
+        path = self._path(blob_id)
+        try:
+            f = await asyncio.to_thread(open, path, "rb")
+        except FileNotFoundError:
+            return None
+
+        async def chunks():
+            try:
+                while True:
+                    chunk = await asyncio.to_thread(f.read, chunk_size)
+                    if not chunk:
+                        break
+                    yield chunk
+            finally:
+                f.close()
+        return chunks()
+
+    async def delete(self, blob_id: str):
+        try:
+            await asyncio.to_thread(self._path(blob_id).unlink)
+        except FileNotFoundError:
+            pass
+
+
+def create_blob_store() -> BlobStore:
+    if settings.HISTORY_BLOB_STORE == "gridfs":
+        return GridFSBlobStore()
+    return LocalBlobStore(settings.BLOB_STORE_DIR)
+
+# Singleton instance
+blob_store = create_blob_store()
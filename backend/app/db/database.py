@@ -1,21 +1,41 @@
-from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
 from app.core.config import settings
 
 class MongoDB:
+    """
+    Async MongoDB connection with a pooled client.
+    Opened and closed from the app lifespan so the client belongs to the serving event loop.
+    """
     def __init__(self):
+        self.client = None
+        self.db = None
+
+    async def connect(self):
         try:
-            self.client = MongoClient(settings.MONGODB_URL)
+            self.client = AsyncIOMotorClient(
+                settings.MONGODB_URL,
+                maxPoolSize=settings.MONGODB_MAX_POOL_SIZE,
+                minPoolSize=settings.MONGODB_MIN_POOL_SIZE,
+                connectTimeoutMS=settings.MONGODB_CONNECT_TIMEOUT_MS,
+                serverSelectionTimeoutMS=settings.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+                socketTimeoutMS=settings.MONGODB_SOCKET_TIMEOUT_MS,
+            )
             self.db = self.client[settings.DB_NAME]
             # Ping the server to confirm a successful connection
-            self.client.admin.command('ping')
+            await self.client.admin.command('ping')
             print("✅ Successfully connected to MongoDB.")
         except Exception as e:
             print(f"❌ Failed to connect to MongoDB: {e}")
-            self.client = None
-            self.db = None
+            self.close()
+
+    def close(self):
+        if self.client is not None:
+            self.client.close()
+        self.client = None
+        self.db = None
 
     def get_collection(self, collection_name: str):
-        if self.db is not None: # <-- CHANGE THIS LINE
+        if self.db is not None:
             return self.db[collection_name]
         return None
 
@@ -1,19 +1,60 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
 from app.api.prediction import router as prediction_router
 from app.api.auth import router as auth_router
 from app.api.history import router as history_router # <-- Import the new router
-from app.model.loader import load_model
+from app.api.monitoring import router as monitoring_router
+from app.api.jobs import router as jobs_router
+from app.model.registry import model_registry
+from app.model.watcher import ModelFileWatcher
+from app.core.executors import executors
+from app.core.uploads import RequestSizeLimitMiddleware
+from app.db.database import mongodb
+from app.services.history_writer import history_writer
+from app.services.job_queue import job_queue
+from app.services.job_worker import JobWorker
+from app.services.prediction_cache import prediction_cache
+from app.services.user_service import user_service
 
-# Load model on startup
-model = load_model()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await mongodb.connect()
+    if mongodb.db is not None:
+        await user_service.ensure_indexes()
+        await prediction_cache.ensure_indexes()
+        await job_queue.ensure_indexes()
+    # Before the model (and TensorFlow) load, so nothing heavy is around when the pools start
+    executors.start()
+    if settings.MODEL_LOAD_MODE == "eager":
+        # Load (and warm up) in a thread so startup doesn't block the loop
+        await asyncio.get_running_loop().run_in_executor(None, model_registry.get)
+    watcher = None
+    if settings.MODEL_WATCH_INTERVAL_SECONDS > 0:
+        watcher = ModelFileWatcher(settings.MODEL_WATCH_INTERVAL_SECONDS)
+        watcher.start()
+    job_worker = None
+    if settings.JOB_EMBEDDED_WORKERS > 0 and mongodb.db is not None:
+        job_worker = JobWorker(settings.JOB_EMBEDDED_WORKERS)
+        job_worker.start()
+    yield
+    if job_worker is not None:
+        await job_worker.stop()
+    if watcher is not None:
+        await watcher.stop()
+    # Flush buffered history before the pools and connection go away
+    await history_writer.stop()
+    executors.shutdown()
+    mongodb.close()
 
 app = FastAPI(
     title=settings.APP_NAME,
     version=settings.APP_VERSION,
     description="A FastAPI service for age prediction from images",
-    debug=settings.DEBUG
+    debug=settings.DEBUG,
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -25,10 +66,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Bound request bodies before multipart parsing; the slack covers multipart framing and form fields
+MULTIPART_OVERHEAD = 64 * 1024
+app.add_middleware(
+    RequestSizeLimitMiddleware,
+    limits={
+        "/api/v1/predict": settings.MAX_FILE_SIZE + MULTIPART_OVERHEAD,
+        "/api/v1/predict/batch": settings.MAX_FILE_SIZE * settings.MAX_BATCH_FILES + MULTIPART_OVERHEAD,
+        "/api/v1/jobs": settings.JOB_MAX_UPLOAD_BYTES,
+        # A full batch of raw pixels at the model input size, plus the .npy header or length prefixes
+        "/api/v1/predict/tensor": settings.MAX_BATCH_FILES * (settings.MODEL_INPUT_SIZE ** 2 * 3 + 4) + 1024,
+    },
+)
+
 # Include routers
 app.include_router(prediction_router, prefix="/api/v1")
 app.include_router(auth_router, prefix="/api/v1/auth")
 app.include_router(history_router, prefix="/api/v1/history", tags=["History"]) # <-- Add the new router
+app.include_router(jobs_router, prefix="/api/v1/jobs", tags=["Jobs"])
+app.include_router(monitoring_router)
 
 @app.get("/")
 async def root():
@@ -41,7 +97,7 @@ async def root():
 # ... (health_check and uvicorn.run remain the same)
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "service": settings.APP_NAME}
+    return {"status": "healthy", "service": settings.APP_NAME, "model": model_registry.info()}
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,188 @@
+import os
+import threading
+import logging
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("keras", "compiled", "tflite")
+
+
+class InferenceBackend:
+    """
+    Common interface for running the age model over a preprocessed batch.
+    `model` is the underlying Keras (or mock) model the backend was built from.
+    """
+    name = "base"
+
+    def __init__(self, model):
+        self.model = model
+        # "<weights version>/<backend>", set by the registry once the backend is ready
+        self.version: Optional[str] = None
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+
+class KerasBackend(InferenceBackend):
+    """Plain `model.predict`; also used for the mock model."""
+    name = "keras"
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        return self.model.predict(batch, verbose=0)
+
+
+class CompiledKerasBackend(InferenceBackend):
+    """Calls the model through a `tf.function` with a fixed input signature, skipping `predict`'s per-call setup."""
+    name = "compiled"
+
+    def __init__(self, model, input_size: int):
+        super().__init__(model)
+        import tensorflow as tf
+
+        signature = [tf.TensorSpec(shape=[None, input_size, input_size, 3], dtype=tf.float32)]
+        self._fn = tf.function(lambda x: model(x, training=False), input_signature=signature)
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        return self._fn(batch).numpy()
+
+
+class TFLiteBackend(InferenceBackend):
+    """
+    Runs a TFLite conversion of the Keras model, optionally with post-training quantization.
+    With `model_path` it runs a prebuilt .tflite file instead and never touches Keras: the
+    interpreter memory-maps the file, so every worker process shares the same weight pages.
+    """
+    name = "tflite"
+
+    def __init__(self, model, quantize: bool = False, num_threads: Optional[int] = None, model_path: Optional[str] = None):
+        super().__init__(model)
+        if model_path is not None:
+            self.model_content = None
+            self._interpreter = _tflite_interpreter_class()(model_path=model_path, num_threads=num_threads)
+        else:
+            self.model_content = convert_to_tflite(model, quantize)
+            self._interpreter = _tflite_interpreter_class()(model_content=self.model_content, num_threads=num_threads)
+        self._interpreter.allocate_tensors()
+        self._input_index = self._interpreter.get_input_details()[0]["index"]
+        self._output_index = self._interpreter.get_output_details()[0]["index"]
+        self._batch_shape = tuple(self._interpreter.get_input_details()[0]["shape"])
+        # A single interpreter is not thread-safe
+        self._lock = threading.Lock()
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        batch = np.ascontiguousarray(batch, dtype=np.float32)
+        with self._lock:
+            if batch.shape != self._batch_shape:
+                self._interpreter.resize_tensor_input(self._input_index, batch.shape, strict=False)
+                self._interpreter.allocate_tensors()
+                self._batch_shape = batch.shape
+            self._interpreter.set_tensor(self._input_index, batch)
+            self._interpreter.invoke()
+            return self._interpreter.get_tensor(self._output_index).copy()
+
+
+def convert_to_tflite(model, quantize: bool = False) -> bytes:
+    """Converts a Keras model to a TFLite flatbuffer."""
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    if quantize:
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    return converter.convert()
+
+
+def export_tflite(model_path: str, output_dir: str, quantize: bool = False) -> str:
+    """
+    Converts the Keras model at `model_path` into `output_dir` and returns the .tflite path.
+    The file name carries a digest of the source weights, so an unchanged model is
+    converted only once and a new one never reuses a stale conversion.
+    """
+    import hashlib
+
+    from app.model.loader import load_model
+
+    digest = hashlib.sha256(Path(model_path).read_bytes()).hexdigest()[:12]
+    output = Path(output_dir) / f"{Path(model_path).stem}-{digest}{'-q' if quantize else ''}.tflite"
+    if output.exists():
+        return str(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    content = convert_to_tflite(load_model(model_path, fallback=False), quantize)
+    # Written under a temporary name and renamed, so a reader never sees a partial file
+    partial = output.with_name(f".{output.name}.{os.getpid()}")
+    partial.write_bytes(content)
+    os.replace(partial, output)
+    return str(output)
+
+
+def create_backend(model, kind: str, input_size: int, quantize: bool = False, num_threads: Optional[int] = None) -> InferenceBackend:
+    """
+    Wraps a loaded model in the requested backend.
+    Compiled and TFLite backends need a real Keras model; the mock always uses `KerasBackend`.
+    """
+    if kind not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{kind}'. Choose one of: {', '.join(BACKENDS)}")
+    if kind == "keras" or not _is_keras_model(model):
+        if kind != "keras":
+            logger.warning(f"Backend '{kind}' requires a Keras model; using 'keras' for {type(model).__name__}")
+        return KerasBackend(model)
+    if kind == "compiled":
+        return CompiledKerasBackend(model, input_size)
+    return TFLiteBackend(model, quantize=quantize, num_threads=num_threads)
+
+
+def check_parity(reference: InferenceBackend, candidate: InferenceBackend, batch: np.ndarray, tolerance: float) -> float:
+    """
+    Runs both backends on the same batch and returns the largest absolute difference.
+    Raises ValueError if it exceeds `tolerance`.
+    """
+    expected = np.asarray(reference.predict(batch), dtype=np.float32)
+    actual = np.asarray(candidate.predict(batch), dtype=np.float32).reshape(expected.shape)
+    max_diff = float(np.max(np.abs(expected - actual))) if expected.size else 0.0
+    if max_diff > tolerance:
+        raise ValueError(
+            f"Backend '{candidate.name}' differs from '{reference.name}' by {max_diff:.4f} (tolerance {tolerance})"
+        )
+    return max_diff
+
+
+def _tflite_interpreter_class():
+    # The standalone runtime is a fraction of TensorFlow's footprint; use it when installed
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        import tensorflow as tf
+        Interpreter = tf.lite.Interpreter
+    return Interpreter
+
+
+def _is_keras_model(model) -> bool:
+    try:
+        from tensorflow import keras
+    except ImportError:
+        return False
+    return isinstance(model, keras.Model)
+
+
+if __name__ == "__main__":
+    # Compare every backend against plain Keras: python -m app.model.backends
+    from app.core.config import settings
+    from app.model.loader import load_model
+
+    logging.basicConfig(level=logging.INFO)
+    model = load_model()
+    size = settings.MODEL_INPUT_SIZE
+    sample = np.random.default_rng(0).random((8, size, size, 3), dtype=np.float32)
+    reference = KerasBackend(model)
+    for kind in BACKENDS[1:]:
+        for quantize in (False, True) if kind == "tflite" else (False,):
+            candidate = create_backend(model, kind, size, quantize=quantize)
+            label = f"{kind}{' (quantized)' if quantize else ''}"
+            try:
+                diff = check_parity(reference, candidate, sample, settings.BACKEND_PARITY_TOLERANCE)
+                print(f"✅ {label}: max abs diff {diff:.4f}")
+            except ValueError as e:
+                print(f"❌ {label}: {e}")
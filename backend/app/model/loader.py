@@ -1,83 +1,154 @@
-import tensorflow as tf
-from tensorflow import keras
-import os
 from pathlib import Path
 from app.core.config import settings
 import logging
+import time
+from typing import Optional
 import numpy as np
 
 logger = logging.getLogger(__name__)
 
-def load_model():
+def load_model(path: Optional[str] = None, fallback: bool = True):
     """
-    Load the pre-trained Keras age prediction model.
-    For now, returns a mock model since we don't have a real .h5 file.
+    Load the pre-trained Keras age prediction model from `path` (default MODEL_PATH).
+    Falls back to the mock model when the file is missing or broken, unless
+    `fallback` is False (hot reloads), in which case the error is raised.
+    Prefer `model_registry.get()`, which calls this once per process.
     """
-    model_path = Path(settings.MODEL_PATH)
+    model_path = Path(path or settings.MODEL_PATH)
     
     try:
         if model_path.exists():
+            # Imported here so routes that never touch the model don't pay for TensorFlow
+            configure_tensorflow_threads()
+            from tensorflow import keras
             model = keras.models.load_model(model_path)
             logger.info(f"Keras model loaded successfully from {model_path}")
             return model
         else:
+            if not fallback:
+                raise FileNotFoundError(f"Model file not found at {model_path}")
             logger.warning(f"Model file not found at {model_path}. Using mock model.")
-            return MockKerasAgePredictor()
+            return create_mock_model()
     except Exception as e:
+        if not fallback:
+            raise
         logger.error(f"Error loading model: {str(e)}. Using mock model.")
-        return MockKerasAgePredictor()
+        return create_mock_model()
+
+def configure_tensorflow_threads():
+    """
+    Applies TF_INTRA_OP_THREADS / TF_INTER_OP_THREADS. Must run before TensorFlow
+    executes its first op; later calls are ignored by TensorFlow, so errors are only logged.
+    """
+    if settings.TF_INTRA_OP_THREADS is None and settings.TF_INTER_OP_THREADS is None:
+        return
+    import tensorflow as tf
+    try:
+        if settings.TF_INTRA_OP_THREADS is not None:
+            tf.config.threading.set_intra_op_parallelism_threads(settings.TF_INTRA_OP_THREADS)
+        if settings.TF_INTER_OP_THREADS is not None:
+            tf.config.threading.set_inter_op_parallelism_threads(settings.TF_INTER_OP_THREADS)
+    except RuntimeError as e:
+        logger.warning(f"TensorFlow thread settings not applied: {e}")
+
+def create_mock_model() -> "MockKerasAgePredictor":
+    """Builds the mock model with the cost model from settings."""
+    return MockKerasAgePredictor(
+        input_size=settings.MODEL_INPUT_SIZE,
+        base_ms=settings.MOCK_MODEL_BASE_MS,
+        per_image_ms=settings.MOCK_MODEL_PER_IMAGE_MS,
+        batch_exponent=settings.MOCK_MODEL_BATCH_EXPONENT,
+        cost_mode=settings.MOCK_MODEL_COST_MODE,
+    )
 
 class MockKerasAgePredictor:
     """
-    Mock Keras model for demonstration purposes.
-    Replace this with your actual trained model.
+    Stand-in for the Keras age model when no weights file is available.
+
+    Ages are a fixed function of the pixels (colour, contrast and edge statistics
+    plus a seeded projection that separates near-identical images), computed for
+    the whole batch at once, so the same image always gets the same age and
+    results can be cached, compared and replayed. An optional cost model
+    makes each call take `base_ms + per_image_ms * batch_size ** batch_exponent`,
+    which lets batching, caching and scaling be load-tested without the weights.
     """
-    
-    def __init__(self):
-        """Initialize mock model with expected input shape"""
-        self.input_shape = (224, 224, 3)
+
+    # Fixed weights over [mean R, G, B, contrast, edge energy, projection]
+    _WEIGHTS = np.array([2.1, -1.3, 0.7, 4.5, -6.0, 40.0], dtype=np.float32)
+    MIN_AGE, MAX_AGE = 18, 65
+
+    def __init__(self, input_size: int = 64, base_ms: float = 0.0, per_image_ms: float = 0.0,
+                 batch_exponent: float = 1.0, cost_mode: str = "sleep"):
+        """
+        Args:
+            input_size: Side length of the square RGB input, as for the real model
+            base_ms: Fixed cost of every predict() call (framework dispatch, kernel launch)
+            per_image_ms: Cost of one image in the batch
+            batch_exponent: Below 1.0 models hardware that gets more efficient with larger batches
+            cost_mode: "sleep" releases the GIL like native inference does; "compute" burns CPU instead
+        """
+        self.input_shape = (None, input_size, input_size, 3)
         self.model_name = "MockAgePredictor"
-    
-    def predict(self, image_array):
+        self.base_ms = base_ms
+        self.per_image_ms = per_image_ms
+        self.batch_exponent = batch_exponent
+        self.cost_mode = cost_mode
+        features = input_size * input_size * 3
+        self._projection = (np.random.default_rng(0).standard_normal(features) / np.sqrt(features)).astype(np.float32)
+
+    def predict(self, image_array, verbose=0):
         """
         Mock prediction method that mimics Keras model.predict()
-        
+
         Args:
             image_array: Preprocessed image array with shape (batch_size, height, width, channels)
-            
+            verbose: Accepted for Keras API compatibility; ignored
+
         Returns:
-            numpy array with predicted age
+            numpy array of shape (batch_size, 1) with predicted ages
         """
-        import random
-        
+        images = np.asarray(image_array, dtype=np.float32)
         # Ensure input has batch dimension
-        if len(image_array.shape) == 3:
-            image_array = np.expand_dims(image_array, axis=0)
-        
-        batch_size = image_array.shape[0]
-        
-        # Mock prediction - return random ages for each image in batch
-        predictions = []
-        for _ in range(batch_size):
-            age = random.randint(18, 65)
-            predictions.append([age])  # Keras typically returns 2D array
-            
-        return np.array(predictions, dtype=np.float32)
-    
+        if images.ndim == 3:
+            images = np.expand_dims(images, axis=0)
+
+        self._spend(self.batch_cost_ms(len(images)))
+
+        colour = images.mean(axis=(1, 2))
+        contrast = images.std(axis=(1, 2, 3))
+        edges = np.abs(np.diff(images, axis=2)).mean(axis=(1, 2, 3))
+        projection = images.reshape(len(images), -1) @ self._projection
+        features = np.column_stack([colour, contrast, edges, projection])
+        # A sine rather than a sigmoid, so small pixel differences still move the age
+        score = 0.5 + 0.5 * np.sin(features @ self._WEIGHTS)
+        ages = np.round(self.MIN_AGE + score * (self.MAX_AGE - self.MIN_AGE))
+        return ages.reshape(-1, 1).astype(np.float32)
+
+    def batch_cost_ms(self, batch_size: int) -> float:
+        """Simulated latency of one predict() call on `batch_size` images."""
+        if not (self.base_ms or self.per_image_ms):
+            return 0.0
+        return self.base_ms + self.per_image_ms * batch_size ** self.batch_exponent
+
+    def _spend(self, cost_ms: float):
+        if cost_ms <= 0:
+            return
+        if self.cost_mode != "compute":
+            time.sleep(cost_ms / 1000)
+            return
+        deadline = time.perf_counter() + cost_ms / 1000
+        block = np.ones((64, 64), dtype=np.float32)
+        while time.perf_counter() < deadline:
+            block = np.tanh(block @ block)
+
     def predict_with_confidence(self, image_array):
         """
         Mock prediction with confidence score.
         This method is custom and won't exist in real Keras models.
         """
         predictions = self.predict(image_array)
-        age = int(predictions[0][0])
-        
-        # Mock confidence calculation
-        import random
-        confidence = random.uniform(0.7, 0.95)
-        
-        return age, confidence
-    
+        return int(predictions[0][0]), 0.85
+
     @property
     def input_shape_info(self):
         """Return expected input shape"""
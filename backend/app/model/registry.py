@@ -0,0 +1,170 @@
+import hashlib
+import threading
+import time
+import logging
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.metrics import MODEL_RELOADS
+from app.model.loader import MockKerasAgePredictor, load_model
+from app.model.backends import InferenceBackend, KerasBackend, TFLiteBackend, check_parity, create_backend
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    """
+    Holds one inference backend per model per process.
+
+    Models are loaded on first `get()` (lazy) or up front from the app lifespan
+    (eager), and a warm-up inference runs right after loading so the first real
+    request doesn't pay graph tracing cost.
+
+    `reload()` loads and warms a new version alongside the serving one, then swaps
+    the reference. Callers that already hold the old backend (batches in flight)
+    finish on it; it is freed once they let go.
+    """
+
+    def __init__(self):
+        self._models: Dict[str, InferenceBackend] = {}
+        self._info: Dict[str, dict] = {}
+        self._previous: Dict[str, dict] = {}
+        self._paths: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+
+    def get(self, name: str = "default") -> InferenceBackend:
+        model = self._models.get(name)
+        if model is not None:
+            return model
+        with self._lock:
+            # Another thread may have finished loading while we waited
+            if name not in self._models:
+                self._models[name], self._info[name] = self._load(self.path(name))
+            return self._models[name]
+
+    def reload(self, name: str = "default", path: Optional[str] = None) -> dict:
+        """
+        Loads `path` (default: the model's current file), warms it up and swaps it in.
+        Blocks while loading, so call it from a worker thread. Raises if the new model
+        can't be loaded; the serving model is left untouched in that case.
+        """
+        with self._reload_lock:
+            path = path or self.path(name)
+            try:
+                backend, info = self._load(path, fallback=False)
+            except Exception:
+                MODEL_RELOADS.inc(result="failed")
+                raise
+            with self._lock:
+                if name in self._info:
+                    self._previous[name] = self._info[name]
+                self._models[name], self._info[name] = backend, info
+                self._paths[name] = path
+            MODEL_RELOADS.inc(result="swapped")
+            logger.info(f"Model '{name}' swapped to {backend.version}")
+            return info
+
+    @property
+    def reloading(self) -> bool:
+        return self._reload_lock.locked()
+
+    def path(self, name: str = "default") -> str:
+        """The file the model was (or will be) loaded from."""
+        return self._paths.get(name, settings.MODEL_PATH)
+
+    def is_loaded(self, name: str = "default") -> bool:
+        return name in self._models
+
+    def version(self, name: str = "default") -> str:
+        """Identifies the weights and backend serving `name`, e.g. for cache keys."""
+        return self.get(name).version
+
+    def _load(self, path: str, fallback: bool = True) -> Tuple[InferenceBackend, dict]:
+        started = time.perf_counter()
+        if path.endswith(".tflite"):
+            # A prebuilt flatbuffer (see app.cli.serve): no Keras model, nothing to check parity against
+            backend = TFLiteBackend(None, num_threads=settings.TFLITE_NUM_THREADS, model_path=path)
+        else:
+            backend = self._build_backend(load_model(path, fallback=fallback))
+        load_seconds = time.perf_counter() - started
+
+        warmup_seconds = None
+        if settings.MODEL_WARMUP:
+            warmup_seconds = self._warm_up(backend)
+
+        version = self._model_version(backend.model, Path(path))
+        backend.version = f"{version}/{backend.name}"
+        info = {
+            "model_type": type(backend.model).__name__ if backend.model is not None else "tflite-flatbuffer",
+            "backend": backend.name,
+            "version": version,
+            "path": path,
+            "loaded_at": datetime.now(timezone.utc).isoformat(),
+            "load_seconds": round(load_seconds, 3),
+            "warmup_seconds": round(warmup_seconds, 3) if warmup_seconds is not None else None,
+        }
+        logger.info(f"Model {backend.version} ready (load {load_seconds:.2f}s, warm-up {warmup_seconds or 0:.2f}s)")
+        return backend, info
+
+    def _model_version(self, model, path: Path) -> str:
+        # Stand-in models (mock, benchmark fixtures) have no weights file to fingerprint
+        declared = getattr(model, "model_version", None)
+        if declared:
+            return declared
+        if isinstance(model, MockKerasAgePredictor):
+            return "mock"
+        return self._file_version(path)
+
+    def _build_backend(self, model) -> InferenceBackend:
+        size = settings.MODEL_INPUT_SIZE
+        backend = create_backend(
+            model,
+            settings.INFERENCE_BACKEND,
+            size,
+            quantize=settings.TFLITE_QUANTIZE,
+            num_threads=settings.TFLITE_NUM_THREADS,
+        )
+        if settings.BACKEND_PARITY_CHECK and not isinstance(backend, KerasBackend):
+            sample = np.random.default_rng(0).random((4, size, size, 3), dtype=np.float32)
+            try:
+                diff = check_parity(KerasBackend(model), backend, sample, settings.BACKEND_PARITY_TOLERANCE)
+                logger.info(f"Backend '{backend.name}' parity check passed (max abs diff {diff:.4f})")
+            except ValueError as e:
+                logger.error(f"{e}. Falling back to the 'keras' backend.")
+                backend = KerasBackend(model)
+        return backend
+
+    @staticmethod
+    def _file_version(path: Path) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        return f"{path.stem}-{digest.hexdigest()[:12]}"
+
+    def _warm_up(self, backend: InferenceBackend) -> Optional[float]:
+        size = settings.MODEL_INPUT_SIZE
+        started = time.perf_counter()
+        try:
+            backend.predict(np.zeros((1, size, size, 3), dtype=np.float32))
+        except Exception as e:
+            logger.warning(f"Model warm-up failed: {e}")
+            return None
+        return time.perf_counter() - started
+
+    def info(self) -> dict:
+        return {
+            "load_mode": settings.MODEL_LOAD_MODE,
+            "models": {
+                name: {"loaded": True, **info, "previous": self._previous.get(name)}
+                for name, info in self._info.items()
+            },
+        }
+
+# Singleton instance
+model_registry = ModelRegistry()
@@ -0,0 +1,70 @@
+import asyncio
+import logging
+import os
+from typing import Optional, Tuple
+
+from app.model.registry import model_registry
+
+logger = logging.getLogger(__name__)
+
+
+class ModelFileWatcher:
+    """
+    Polls the serving model's file and hot-reloads it when it changes.
+
+    A new (mtime, size) must be seen on two consecutive polls before reloading, so a
+    file that is still being copied into place isn't loaded half-written. Replacing
+    the file with an atomic rename is still the safest way to deploy.
+    """
+
+    def __init__(self, interval_seconds: float, name: str = "default"):
+        self.interval_seconds = interval_seconds
+        self.name = name
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Watching {model_registry.path(self.name)} for model updates every {self.interval_seconds}s")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        path = model_registry.path(self.name)
+        current = self._stat()
+        candidate = None
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            if model_registry.path(self.name) != path:
+                # An admin reload switched files; start watching the new one as it is
+                path, current, candidate = model_registry.path(self.name), self._stat(), None
+                continue
+            seen = self._stat()
+            if seen == current or seen is None:
+                candidate = None
+                continue
+            if seen != candidate:
+                # Changed since the last poll; wait for it to settle
+                candidate = seen
+                continue
+            current, candidate = seen, None
+            logger.info(f"Model file {model_registry.path(self.name)} changed, reloading")
+            try:
+                await loop.run_in_executor(None, model_registry.reload, self.name)
+            except Exception as e:
+                logger.error(f"Hot reload failed, keeping the current model: {e}")
+
+    def _stat(self) -> Optional[Tuple[float, int]]:
+        try:
+            stat = os.stat(model_registry.path(self.name))
+        except OSError:
+            return None
+        return stat.st_mtime, stat.st_size
@@ -1,10 +1,12 @@
 from pydantic import BaseModel
-from typing import Optional
+from datetime import datetime
+from typing import List, Optional
 
 class PredictionResponse(BaseModel):
     """Response schema for age prediction"""
     age: int
     confidence: Optional[float] = None
+    model_version: Optional[str] = None
     message: str = "Age prediction successful"
     
     class Config:
@@ -12,10 +14,56 @@ class PredictionResponse(BaseModel):
             "example": {
                 "age": 25,
                 "confidence": 0.85,
+                "model_version": "age_predictor-3f2a9c81d0e4/keras",
                 "message": "Age prediction successful"
             }
         }
 
+class BatchPredictionItem(BaseModel):
+    """Result for one image of a batch; either age/confidence or error is set"""
+    filename: str
+    age: Optional[int] = None
+    confidence: Optional[float] = None
+    error: Optional[str] = None
+
+class BatchPredictionResponse(BaseModel):
+    """Response schema for batch age prediction"""
+    results: List[BatchPredictionItem]
+    succeeded: int
+    failed: int
+    model_version: Optional[str] = None
+
+class TensorPredictionResponse(BaseModel):
+    """Response schema for pre-decoded tensor input; one age and confidence per image, in input order"""
+    ages: List[int]
+    confidences: List[float]
+    model_version: Optional[str] = None
+
+class JobStatus(BaseModel):
+    """State of an asynchronous scoring job"""
+    id: str
+    status: str  # queued, running, succeeded, failed or cancelled
+    priority: int
+    total: int
+    processed: int
+    attempts: int
+    error: Optional[str] = None
+    model_version: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+class JobResults(BaseModel):
+    """Per-image results of a finished job, in submission order"""
+    id: str
+    status: str
+    model_version: Optional[str] = None
+    results: List[BatchPredictionItem]
+
+class ModelReloadRequest(BaseModel):
+    """Optional model file to switch to; defaults to reloading the current file"""
+    path: Optional[str] = None
+
 class ErrorResponse(BaseModel):
     """Error response schema"""
     error: str
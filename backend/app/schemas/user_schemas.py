@@ -4,20 +4,66 @@ from datetime import datetime
 from uuid import UUID, uuid4
 
 # --- History ---
+# Stored in the "history" collection; image bytes live in the blob store.
 class HistoryItem(BaseModel):
     id: UUID = Field(default_factory=uuid4)
-    image_base64: str
+    image_id: str
+    thumbnail_id: Optional[str] = None
+    # Set when the images are stored: the format they were re-encoded to, and the
+    # content hash shared by every history item of the same upload
+    content_type: str = "image/jpeg"
+    thumbnail_content_type: str = "image/jpeg"
+    content_key: Optional[str] = None
     predicted_age: int
     confidence: float
+    model_version: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.now)
 
+# Lightweight list entry: metadata plus links, no image payload
+class HistorySummary(BaseModel):
+    id: UUID
+    predicted_age: int
+    confidence: float
+    model_version: Optional[str] = None
+    created_at: datetime
+    image_url: str
+    thumbnail_url: str
+
+class HistoryPage(BaseModel):
+    items: List[HistorySummary]
+    next_cursor: Optional[str] = None
+
+# Aggregates over a user's whole history, maintained incrementally
+class AgeBucket(BaseModel):
+    min_age: int
+    max_age: int
+    count: int
+
+class MonthlyStats(BaseModel):
+    month: str  # YYYY-MM
+    count: int
+    average_age: float
+    average_confidence: float
+
+class HistoryStatsResponse(BaseModel):
+    count: int
+    average_age: Optional[float] = None
+    average_confidence: Optional[float] = None
+    age_histogram: List[AgeBucket]
+    monthly: List[MonthlyStats]
+    updated_at: Optional[datetime] = None
+
 # --- User ---
 class UserBase(BaseModel):
     email: EmailStr
 
-class UserInDB(UserBase):
+# What auth dependencies load: identity and flags only, no credentials or history
+class UserPrincipal(UserBase):
+    disabled: bool = False
+    is_admin: bool = False
+
+class UserInDB(UserPrincipal):
     hashed_password: str
-    history: List[HistoryItem] = []
 
     class Config:
         orm_mode = True
@@ -0,0 +1,152 @@
+import asyncio
+import time
+import logging
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _PendingItem:
+    array: np.ndarray
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+class MicroBatcher:
+    """
+    Groups concurrent single-image predictions into one model call.
+
+    Callers submit one preprocessed image (H, W, C) and await their own element
+    of what `predict_fn` returns for the list of submitted arrays: a row of the
+    model output, or anything indexable per item (e.g. (row, model version) pairs). A background task drains the queue, waiting at most
+    `max_wait_ms` after the first item for up to `max_batch_size` items.
+    When an executor is given, `predict_fn` runs there instead of on the event
+    loop, with at most `max_concurrent_batches` batches in flight.
+    """
+
+    def __init__(
+        self,
+        predict_fn: Callable[[List[np.ndarray]], Sequence],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        executor: Optional[Callable[[], Executor]] = None,
+        max_concurrent_batches: int = 1,
+    ):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.executor = executor
+        self.max_concurrent_batches = max(1, max_concurrent_batches)
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._arrival: Optional[asyncio.Event] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._inflight_batches = set()
+
+        # Tuning metrics
+        self._batches = 0
+        self._items = 0
+        self._max_batch_seen = 0
+        self._last_batch_size = 0
+        self._queue_wait_total = 0.0
+        self._queue_wait_max = 0.0
+
+    async def submit(self, array: np.ndarray):
+        """Queue a single image and return its element of the batched prediction."""
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait(_PendingItem(array=array, future=future))
+        self._arrival.set()
+        return await future
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._worker.get_loop() is not loop:
+            self._queue = asyncio.Queue()
+            self._arrival = asyncio.Event()
+            self._slots = asyncio.Semaphore(self.max_concurrent_batches)
+            self._worker = loop.create_task(self._run())
+
+    async def _collect(self) -> List[_PendingItem]:
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while True:
+            while len(batch) < self.max_batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            remaining = deadline - time.perf_counter()
+            if len(batch) >= self.max_batch_size or remaining <= 0:
+                return batch
+            # Waiting on an event rather than queue.get() keeps a timeout from dropping an item
+            self._arrival.clear()
+            try:
+                await asyncio.wait_for(self._arrival.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # Keep collecting while earlier batches are still predicting, up to the slot limit
+            await self._slots.acquire()
+            batch = await self._collect()
+            task = loop.create_task(self._predict(batch))
+            self._inflight_batches.add(task)
+            task.add_done_callback(self._inflight_batches.discard)
+
+    async def _predict(self, batch: List[_PendingItem]):
+        started = time.perf_counter()
+        self._record(batch, started)
+        try:
+            await self._predict_batch(batch, started)
+        finally:
+            self._slots.release()
+
+    async def _predict_batch(self, batch: List[_PendingItem], started: float):
+        try:
+            inputs = [item.array for item in batch]
+            if self.executor is not None:
+                predictions = await asyncio.get_running_loop().run_in_executor(self.executor(), self.predict_fn, inputs)
+            else:
+                predictions = self.predict_fn(inputs)
+        except Exception as e:
+            logger.error(f"Batched prediction failed for {len(batch)} items: {e}")
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(e)
+            return
+
+        for i, item in enumerate(batch):
+            if not item.future.done():
+                item.future.set_result(predictions[i])
+        logger.debug(f"Predicted batch of {len(batch)} in {(time.perf_counter() - started) * 1000:.1f}ms")
+
+    def _record(self, batch: List[_PendingItem], started: float):
+        size = len(batch)
+        self._batches += 1
+        self._items += size
+        self._last_batch_size = size
+        self._max_batch_seen = max(self._max_batch_seen, size)
+        for item in batch:
+            wait = started - item.enqueued_at
+            self._queue_wait_total += wait
+            self._queue_wait_max = max(self._queue_wait_max, wait)
+
+    def stats(self) -> dict:
+        """Per-batch size and queue-wait metrics for tuning."""
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "batches": self._batches,
+            "items": self._items,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "last_batch_size": self._last_batch_size,
+            "max_batch_size_seen": self._max_batch_seen,
+            "avg_batch_size": round(self._items / self._batches, 2) if self._batches else 0.0,
+            "avg_queue_wait_ms": round(self._queue_wait_total / self._items * 1000, 3) if self._items else 0.0,
+            "max_queue_wait_ms": round(self._queue_wait_max * 1000, 3),
+        }
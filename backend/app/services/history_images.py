@@ -0,0 +1,112 @@
+import hashlib
+import logging
+from datetime import datetime
+
+from pymongo import ReturnDocument
+
+from app.core.config import settings
+from app.core.executors import executors
+from app.core.metrics import HISTORY_IMAGES
+from app.core.uploads import sniff_image
+from app.db.blob_store import blob_store
+from app.db.database import get_db_collection
+from app.services.preprocessing import HISTORY_FORMATS, encode_history_image
+
+logger = logging.getLogger(__name__)
+
+
+class HistoryImageStore:
+    """
+    Content-addressed, reference-counted storage of history images.
+
+    Uploads are keyed by the SHA-256 of their bytes. The first time an upload is
+    seen it is re-encoded (size-capped WebP or JPEG, see `encode_history_image`)
+    and stored with its thumbnail; identical uploads afterwards only bump the
+    reference count of the "history_images" document. Blobs are deleted when the
+    last history item referencing them is.
+    """
+
+    @property
+    def collection(self):
+        return get_db_collection("history_images")
+
+    @staticmethod
+    def key(image_bytes: bytes) -> str:
+        return hashlib.sha256(image_bytes).hexdigest()
+
+    async def acquire(self, image_bytes: bytes, image_id: str, thumbnail_id: str) -> dict:
+        """
+        Takes a reference to the stored copy of `image_bytes`, storing it under the
+        given blob ids if it is new. Returns the history document fields pointing at it.
+        """
+        key = self.key(image_bytes)
+        doc = await self.collection.find_one_and_update({"_id": key}, {"$inc": {"refs": 1}}, return_document=ReturnDocument.AFTER)
+        if doc is not None:
+            HISTORY_IMAGES.inc(result="deduplicated")
+            return self._fields(doc)
+
+        try:
+            image, content_type, thumbnail = await executors.run_preprocess(
+                encode_history_image, image_bytes, settings.HISTORY_IMAGE_MAX_SIZE, settings.THUMBNAIL_SIZE,
+                settings.HISTORY_IMAGE_FORMAT, settings.HISTORY_IMAGE_QUALITY,
+            )
+        except Exception as e:
+            logger.warning(f"Could not re-encode history image {key[:12]}, storing it as uploaded: {e}")
+            header = sniff_image(image_bytes)
+            image, content_type, thumbnail = image_bytes, header.content_type if header else "application/octet-stream", None
+        await blob_store.put(image, image_id)
+        if thumbnail is not None:
+            await blob_store.put(thumbnail, thumbnail_id)
+
+        stored = {
+            "image_id": image_id,
+            "thumbnail_id": thumbnail_id if thumbnail is not None else None,
+            "content_type": content_type,
+            "thumbnail_content_type": HISTORY_FORMATS[settings.HISTORY_IMAGE_FORMAT][1],
+            "size": len(image),
+            "created_at": datetime.utcnow(),
+        }
+        doc = await self.collection.find_one_and_update(
+            {"_id": key},
+            {"$setOnInsert": stored, "$inc": {"refs": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        if doc["image_id"] != image_id:
+            # An identical upload was stored concurrently and won; drop this copy
+            await self._delete_blobs(stored)
+            HISTORY_IMAGES.inc(result="deduplicated")
+        else:
+            HISTORY_IMAGES.inc(result="stored")
+        return self._fields(doc)
+
+    async def release(self, key: str):
+        """Drops one reference; deletes the blobs once none are left."""
+        doc = await self.collection.find_one_and_update({"_id": key}, {"$inc": {"refs": -1}}, return_document=ReturnDocument.AFTER)
+        if doc is None or doc["refs"] > 0:
+            return
+        # Only if nobody took a new reference in the meantime
+        result = await self.collection.delete_one({"_id": key, "refs": {"$lte": 0}})
+        if result.deleted_count:
+            await self._delete_blobs(doc)
+            HISTORY_IMAGES.inc(result="freed")
+
+    @staticmethod
+    def _fields(doc: dict) -> dict:
+        return {
+            "content_key": doc["_id"],
+            "image_id": doc["image_id"],
+            "thumbnail_id": doc.get("thumbnail_id"),
+            "content_type": doc["content_type"],
+            "thumbnail_content_type": doc.get("thumbnail_content_type", "image/jpeg"),
+        }
+
+    @staticmethod
+    async def _delete_blobs(doc: dict):
+        for blob_id in (doc.get("image_id"), doc.get("thumbnail_id")):
+            if blob_id:
+                await blob_store.delete(blob_id)
+
+
+# Singleton instance
+history_images = HistoryImageStore()
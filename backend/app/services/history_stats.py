@@ -0,0 +1,152 @@
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+from pymongo import UpdateOne
+
+from app.core.config import settings
+from app.db.database import get_db_collection
+
+logger = logging.getLogger(__name__)
+
+
+class HistoryStats:
+    """
+    Per-user prediction aggregates, one small "history_stats" document per user:
+    totals, an age histogram (STATS_AGE_BUCKET_WIDTH-year buckets) and per-month count,
+    age and confidence sums. Documents are kept current with `$inc` as history is
+    written and deleted, so reading them costs the same however long the history is.
+
+    Anything that bypasses these updates (manual edits, a crash between the history
+    write and the stats update) makes them drift; `rebuild()` recomputes them from
+    the history collection. History written before the stats existed is only counted
+    after a rebuild, so run `python -m app.cli.rebuild_stats` once when deploying them.
+    """
+
+    @property
+    def collection(self):
+        return get_db_collection("history_stats")
+
+    @property
+    def history(self):
+        return get_db_collection("history")
+
+    @staticmethod
+    def _bucket(age: int) -> str:
+        width = settings.STATS_AGE_BUCKET_WIDTH
+        return str(int(age) // width * width)
+
+    @classmethod
+    def _increments(cls, docs: Iterable[dict], sign: int = 1) -> Dict[str, Dict[str, float]]:
+        """Folds history documents into one `$inc` per user."""
+        increments: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(int))
+        for doc in docs:
+            inc = increments[doc["email"]]
+            month = doc["created_at"].strftime("%Y-%m")
+            for prefix in ("", f"months.{month}."):
+                inc[f"{prefix}count"] += sign
+                inc[f"{prefix}age_sum"] += sign * doc["predicted_age"]
+                inc[f"{prefix}confidence_sum"] += sign * doc["confidence"]
+            inc[f"age_histogram.{cls._bucket(doc['predicted_age'])}"] += sign
+        return increments
+
+    async def record_added(self, docs: Iterable[dict]):
+        """Counts history documents about to be written; one upsert per user in the batch."""
+        await self._apply(self._increments(docs))
+
+    async def record_deleted(self, docs: Iterable[dict]):
+        """
+        Uncounts deleted (or never written) history documents. The history writer counts
+        entries before inserting them, so any document that can be deleted was already
+        counted. Users without a stats document are left alone rather than given negative
+        totals for history that predates the stats.
+        """
+        await self._apply(self._increments(docs, sign=-1), upsert=False)
+
+    async def _apply(self, increments: Dict[str, Dict[str, float]], upsert: bool = True):
+        if not increments:
+            return
+        now = datetime.utcnow()
+        await self.collection.bulk_write([
+            UpdateOne({"_id": email}, {"$inc": dict(inc), "$set": {"updated_at": now}}, upsert=upsert)
+            for email, inc in increments.items()
+        ], ordered=False)
+
+    async def get(self, email: str) -> Optional[dict]:
+        return await self.collection.find_one({"_id": email})
+
+    async def rebuild(self, email: Optional[str] = None) -> int:
+        """
+        Recomputes the aggregates of one user (or everyone) from the history collection
+        with an aggregation pipeline, replacing the stored documents. Returns the number
+        of users rebuilt. Predictions written while it runs may be missed; run it again
+        if writes were in flight.
+        """
+        width = settings.STATS_AGE_BUCKET_WIDTH
+        pipeline = [{"$match": {"email": email}}] if email else []
+        pipeline.append(
+            {"$group": {
+                "_id": {
+                    "email": "$email",
+                    "bucket": {"$subtract": ["$predicted_age", {"$mod": ["$predicted_age", width]}]},
+                    "month": {"$dateToString": {"format": "%Y-%m", "date": "$created_at"}},
+                },
+                "count": {"$sum": 1},
+                "age_sum": {"$sum": "$predicted_age"},
+                "confidence_sum": {"$sum": "$confidence"},
+            }}
+        )
+        # One row per (user, bucket, month) is small enough to fold here
+        docs: Dict[str, dict] = {}
+        async for row in self.history.aggregate(pipeline, allowDiskUse=True):
+            key = row["_id"]
+            doc = docs.setdefault(key["email"], {"_id": key["email"], "count": 0, "age_sum": 0, "confidence_sum": 0.0,
+                                                 "age_histogram": {}, "months": {}})
+            month = doc["months"].setdefault(key["month"], {"count": 0, "age_sum": 0, "confidence_sum": 0.0})
+            for target in (doc, month):
+                target["count"] += row["count"]
+                target["age_sum"] += row["age_sum"]
+                target["confidence_sum"] += row["confidence_sum"]
+            bucket = str(int(key["bucket"]))
+            doc["age_histogram"][bucket] = doc["age_histogram"].get(bucket, 0) + row["count"]
+
+        now = datetime.utcnow()
+        for doc in docs.values():
+            doc["updated_at"] = now
+            await self.collection.replace_one({"_id": doc["_id"]}, doc, upsert=True)
+        # Users whose history is now empty
+        if email is None:
+            await self.collection.delete_many({"_id": {"$nin": list(docs)}})
+        elif not docs:
+            await self.collection.delete_one({"_id": email})
+        return len(docs)
+
+
+def summarize(doc: Optional[dict]) -> dict:
+    """Turns a stats document into the API response: averages instead of sums, empty buckets dropped."""
+    doc = doc or {}
+    width = settings.STATS_AGE_BUCKET_WIDTH
+    count = int(doc.get("count", 0))
+    histogram = sorted((int(bucket), int(n)) for bucket, n in doc.get("age_histogram", {}).items() if n > 0)
+    months = sorted((month, values) for month, values in doc.get("months", {}).items() if values.get("count", 0) > 0)
+    return {
+        "count": count,
+        "average_age": round(doc["age_sum"] / count, 2) if count else None,
+        "average_confidence": round(doc["confidence_sum"] / count, 4) if count else None,
+        "age_histogram": [{"min_age": bucket, "max_age": bucket + width - 1, "count": n} for bucket, n in histogram],
+        "monthly": [
+            {
+                "month": month,
+                "count": int(values["count"]),
+                "average_age": round(values["age_sum"] / values["count"], 2),
+                "average_confidence": round(values["confidence_sum"] / values["count"], 4),
+            }
+            for month, values in months
+        ],
+        "updated_at": doc.get("updated_at"),
+    }
+
+
+# Singleton instance
+history_stats = HistoryStats()
@@ -0,0 +1,156 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import List, Optional
+
+from pymongo.errors import BulkWriteError
+
+from app.core.config import settings
+from app.core.metrics import ERRORS, HISTORY_ENTRIES, STAGE_SECONDS
+from app.db.database import get_db_collection
+from app.services.history_images import history_images
+from app.services.history_stats import history_stats
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PendingHistory:
+    doc: dict
+    image_bytes: bytes
+
+
+class HistoryWriter:
+    """
+    Write-behind buffer for history entries.
+
+    Requests only enqueue; a background task stores the (deduplicated) images and
+    thumbnails and inserts the buffered documents with one `insert_many` every
+    HISTORY_FLUSH_INTERVAL_MS, or sooner once HISTORY_FLUSH_BATCH_SIZE entries are
+    waiting. Entries still buffered when the process dies are lost; `stop()` flushes
+    them on a clean shutdown.
+    """
+
+    def __init__(self, flush_interval_ms: int, max_batch_size: int):
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.max_batch_size = max(1, max_batch_size)
+        self._pending: List[PendingHistory] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> int:
+        """Entries buffered but not yet written."""
+        return len(self._pending)
+
+    def enqueue(self, entries: List[PendingHistory]):
+        self._ensure_task()
+        self._pending.extend(entries)
+        if len(self._pending) >= self.max_batch_size:
+            self._wakeup.set()
+
+    def _ensure_task(self):
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._wakeup = asyncio.Event()
+            self._task = loop.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self):
+        while self._pending:
+            batch = self._pending[:self.max_batch_size]
+            del self._pending[:self.max_batch_size]
+            try:
+                with STAGE_SECONDS.time(stage="history_write"):
+                    written = await self._write(batch)
+            except Exception as e:
+                written = 0
+                logger.error(f"Failed to write {len(batch)} history entries: {e}")
+            HISTORY_ENTRIES.inc(written, status="written")
+            if written < len(batch):
+                ERRORS.inc(len(batch) - written, type="history_write")
+
+    async def _write(self, batch: List[PendingHistory]) -> int:
+        """
+        Stores the batch's images, counts the entries in the user stats, then inserts the
+        documents. Counting first means no entry is visible (and deletable) before it is
+        counted, so a delete never races the increment. Entries that don't make it into the
+        collection give their image references and stats counts back. Returns how many were written.
+        """
+        stored = await asyncio.gather(*(self._store_images(entry) for entry in batch), return_exceptions=True)
+        docs = []
+        for entry, result in zip(batch, stored):
+            if isinstance(result, Exception):
+                logger.error(f"Failed to store the image of history entry {entry.doc['id']}: {result}")
+            else:
+                docs.append(entry.doc)
+        if not docs:
+            return 0
+
+        try:
+            await history_stats.record_added(docs)
+            counted = True
+        except Exception as e:
+            # The entries are still written; only the aggregates are behind until the next rebuild
+            logger.error(f"Failed to update history stats for {len(docs)} entries: {e}")
+            counted = False
+
+        collection = get_db_collection("history")
+        try:
+            await collection.insert_many(docs, ordered=False)
+            written = docs
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            failed = {error["index"] for error in errors}
+            written = [doc for i, doc in enumerate(docs) if i not in failed]
+            logger.error(f"Failed to insert {len(failed)} of {len(docs)} history entries: {errors[0]['errmsg'] if errors else e}")
+        except Exception as e:
+            # Unknown how much of the batch landed before the error; the collection knows
+            logger.error(f"Insert of {len(docs)} history entries failed, checking which were written: {e}")
+            ids = [doc["id"] for doc in docs]
+            inserted = {doc["id"] async for doc in collection.find({"id": {"$in": ids}}, {"id": 1})}
+            written = [doc for doc in docs if doc["id"] in inserted]
+        written_ids = {doc["id"] for doc in written}
+        unwritten = [doc for doc in docs if doc["id"] not in written_ids]
+        for doc in unwritten:
+            await self._release_images(doc)
+        if counted and unwritten:
+            try:
+                await history_stats.record_deleted(unwritten)
+            except Exception as e:
+                logger.error(f"Failed to uncount {len(unwritten)} unwritten history entries: {e}")
+
+        logger.debug(f"Flushed {len(written)} history entries")
+        return len(written)
+
+    async def _store_images(self, entry: PendingHistory):
+        # Points the document at the (possibly already stored) compressed copy of the upload
+        entry.doc.update(await history_images.acquire(entry.image_bytes, entry.doc["image_id"], entry.doc["thumbnail_id"]))
+
+    @staticmethod
+    async def _release_images(doc: dict):
+        try:
+            await history_images.release(doc["content_key"])
+        except Exception as e:
+            logger.error(f"Failed to release the image of unwritten history entry {doc['id']}: {e}")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+# Singleton instance
+history_writer = HistoryWriter(settings.HISTORY_FLUSH_INTERVAL_MS, settings.HISTORY_FLUSH_BATCH_SIZE)
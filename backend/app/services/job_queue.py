@@ -0,0 +1,242 @@
+import asyncio
+import logging
+import os
+import socket
+from datetime import datetime, timedelta
+from typing import List, Optional
+from uuid import uuid4
+
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+
+from app.core.config import settings
+from app.core.metrics import JOBS
+from app.db.blob_store import blob_store
+from app.db.database import get_db_collection
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = "queued", "running", "succeeded", "failed", "cancelled"
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+# Never sent to clients: the per-image input list and the (possibly long) results
+STATUS_PROJECTION = {"items": 0, "results": 0}
+
+
+class JobQueueFullError(Exception):
+    """Raised when a user already has JOB_MAX_QUEUED_PER_USER unfinished jobs."""
+
+
+class JobQueue:
+    """
+    Persistent scoring jobs in the "jobs" collection; no broker besides MongoDB.
+
+    Workers claim the highest-priority, oldest queued job with an atomic
+    find-and-modify and hold it under a lease they renew as they go. Results are
+    appended one chunk at a time together with the progress offset, so a worker
+    that dies loses at most the chunk in flight: once its lease expires another
+    worker claims the job and resumes from that offset. Every write a worker makes
+    is fenced on its lease, so a worker that lost its lease can't clobber the job.
+    Jobs that keep failing are given up after JOB_MAX_ATTEMPTS claims.
+    """
+
+    @property
+    def collection(self):
+        return get_db_collection("jobs")
+
+    async def ensure_indexes(self):
+        await self.collection.create_index([("status", ASCENDING), ("priority", DESCENDING), ("created_at", ASCENDING)])
+        await self.collection.create_index([("email", ASCENDING), ("status", ASCENDING)])
+        # Finished jobs (and their results) expire; unfinished ones have no finished_at
+        await self.collection.create_index("finished_at", expireAfterSeconds=settings.JOB_RESULT_TTL_SECONDS)
+
+    # --- Client side ---
+
+    async def check_capacity(self, email: str):
+        """Raises JobQueueFullError if the user can't queue another job right now."""
+        unfinished = await self.collection.count_documents({"email": email, "status": {"$in": [QUEUED, RUNNING]}})
+        if unfinished >= settings.JOB_MAX_QUEUED_PER_USER:
+            raise JobQueueFullError(f"You already have {unfinished} unfinished jobs")
+
+    async def store_item(self, filename: str, content: Optional[bytes], error: Optional[str]) -> dict:
+        """
+        Stores one input image as it is read from the upload and returns its job item.
+        Items that already failed validation are kept (without a blob) and recorded as
+        failed results when the job runs.
+        """
+        blob_id = await blob_store.put(content) if error is None else None
+        return {"filename": filename, "blob_id": blob_id, "error": error}
+
+    async def discard_items(self, entries: List[dict]):
+        """Deletes the blobs of items stored for a submission that was then rejected."""
+        await self._delete_inputs({"items": entries})
+
+    async def submit(self, email: str, entries: List[dict], priority: int = 0) -> dict:
+        """Queues a job for items stored with `store_item`."""
+        await self.check_capacity(email)
+        now = datetime.utcnow()
+        job = {
+            "_id": str(uuid4()),
+            "email": email,
+            "status": QUEUED,
+            "priority": priority,
+            "total": len(entries),
+            "processed": 0,
+            "attempts": 0,
+            "error": None,
+            "model_version": None,
+            "created_at": now,
+            "updated_at": now,
+            "run_after": now,
+            "started_at": None,
+            "finished_at": None,
+            "lease_owner": None,
+            "lease_expires_at": None,
+            "items": entries,
+            "results": [],
+        }
+        await self.collection.insert_one(job)
+        JOBS.inc(event="submitted")
+        logger.info(f"Queued job {job['_id']} with {len(entries)} images for {email}")
+        return {key: value for key, value in job.items() if key not in STATUS_PROJECTION}
+
+    async def get(self, email: str, job_id: str, with_results: bool = False) -> Optional[dict]:
+        projection = {"items": 0} if with_results else STATUS_PROJECTION
+        return await self.collection.find_one({"_id": job_id, "email": email}, projection)
+
+    async def wait(self, email: str, job_id: str, timeout: float) -> Optional[dict]:
+        """
+        Long-poll: returns the job as soon as it finishes or makes progress, or after
+        `timeout` seconds. Polls the document, which works without a replica set.
+        """
+        job = await self.get(email, job_id)
+        deadline = asyncio.get_running_loop().time() + min(timeout, settings.JOB_LONG_POLL_MAX_SECONDS)
+        seen = job and (job["status"], job["processed"])
+        while job is not None and job["status"] not in FINISHED and asyncio.get_running_loop().time() < deadline:
+            await asyncio.sleep(settings.JOB_POLL_INTERVAL_SECONDS)
+            job = await self.get(email, job_id)
+            if job is not None and (job["status"], job["processed"]) != seen:
+                break
+        return job
+
+    async def cancel(self, email: str, job_id: str) -> Optional[dict]:
+        """Cancels an unfinished job; a worker processing it stops at its next chunk."""
+        job = await self.collection.find_one_and_update(
+            {"_id": job_id, "email": email, "status": {"$in": [QUEUED, RUNNING]}},
+            {"$set": {"status": CANCELLED, "finished_at": datetime.utcnow(), "updated_at": datetime.utcnow(), "lease_owner": None}},
+            return_document=ReturnDocument.AFTER,
+        )
+        if job is None:
+            return await self.get(email, job_id)
+        JOBS.inc(event="cancelled")
+        await self._delete_inputs(job)
+        return {key: value for key, value in job.items() if key not in STATUS_PROJECTION}
+
+    # --- Worker side ---
+
+    @staticmethod
+    def new_worker_id() -> str:
+        return f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:6]}"
+
+    async def claim(self, worker_id: str) -> Optional[dict]:
+        """
+        Leases the next runnable job: queued ones whose backoff has passed, or running
+        ones whose worker stopped renewing its lease. Users already at
+        JOB_MAX_RUNNING_PER_USER are skipped.
+        """
+        now = datetime.utcnow()
+        busy = await self._users_at_capacity(now)
+        runnable = {
+            "$or": [
+                {"status": QUEUED, "run_after": {"$lte": now}},
+                {"status": RUNNING, "lease_expires_at": {"$lt": now}},
+            ],
+        }
+        if busy:
+            runnable["email"] = {"$nin": busy}
+        job = await self.collection.find_one_and_update(
+            runnable,
+            {
+                "$set": {"status": RUNNING, "lease_owner": worker_id, "updated_at": now,
+                         "lease_expires_at": now + timedelta(seconds=settings.JOB_LEASE_SECONDS)},
+                "$inc": {"attempts": 1},
+            },
+            sort=[("priority", DESCENDING), ("created_at", ASCENDING)],
+            projection={"results": 0},
+            return_document=ReturnDocument.AFTER,
+        )
+        if job is None:
+            return None
+
+        # Workers claiming for the same user at the same moment can overshoot the cap; give the job back
+        if await self._running_for(job["email"], now) > settings.JOB_MAX_RUNNING_PER_USER:
+            await self.release(job, worker_id)
+            return None
+        if job["attempts"] > settings.JOB_MAX_ATTEMPTS:
+            await self.fail(job, worker_id, job.get("error") or "Worker lost its lease too many times")
+            return None
+        if job.get("started_at") is None:
+            await self._fenced_update(job, worker_id, {"$set": {"started_at": now}})
+        return job
+
+    async def record_progress(self, job: dict, worker_id: str, results: List[dict], model_version: str) -> bool:
+        """
+        Appends a chunk of results, advances the offset and renews the lease in one
+        write. Returns False if the lease was lost or the job cancelled; stop then.
+        """
+        recorded = await self._fenced_update(job, worker_id, {
+            "$push": {"results": {"$each": results}},
+            "$inc": {"processed": len(results)},
+            "$set": {"model_version": model_version,
+                     "lease_expires_at": datetime.utcnow() + timedelta(seconds=settings.JOB_LEASE_SECONDS)},
+        }, processed=job["processed"])
+        if recorded:
+            job["processed"] += len(results)
+        return recorded
+
+    async def release(self, job: dict, worker_id: str):
+        """Hands a job back untouched (worker shutting down) without using up an attempt."""
+        await self._fenced_update(job, worker_id, {"$set": {"status": QUEUED, "lease_owner": None}, "$inc": {"attempts": -1}})
+
+    async def complete(self, job: dict, worker_id: str):
+        if await self._fenced_update(job, worker_id, {"$set": {"status": SUCCEEDED, "finished_at": datetime.utcnow(), "lease_owner": None}}):
+            JOBS.inc(event="succeeded")
+            await self._delete_inputs(job)
+
+    async def fail(self, job: dict, worker_id: str, error: str):
+        """Puts the job back with a backoff, or fails it for good once it is out of attempts."""
+        if job["attempts"] < settings.JOB_MAX_ATTEMPTS:
+            run_after = datetime.utcnow() + timedelta(seconds=settings.JOB_RETRY_BACKOFF_SECONDS * job["attempts"])
+            if await self._fenced_update(job, worker_id, {"$set": {"status": QUEUED, "error": error, "run_after": run_after, "lease_owner": None}}):
+                JOBS.inc(event="retried")
+            return
+        if await self._fenced_update(job, worker_id, {"$set": {"status": FAILED, "error": error, "finished_at": datetime.utcnow(), "lease_owner": None}}):
+            JOBS.inc(event="failed")
+            await self._delete_inputs(job)
+
+    async def _fenced_update(self, job: dict, worker_id: str, update: dict, **expected) -> bool:
+        update.setdefault("$set", {})["updated_at"] = datetime.utcnow()
+        result = await self.collection.update_one({"_id": job["_id"], "status": RUNNING, "lease_owner": worker_id, **expected}, update)
+        return result.matched_count == 1
+
+    async def _running_for(self, email: str, now: datetime) -> int:
+        return await self.collection.count_documents({"email": email, "status": RUNNING, "lease_expires_at": {"$gte": now}})
+
+    async def _users_at_capacity(self, now: datetime) -> List[str]:
+        pipeline = [
+            {"$match": {"status": RUNNING, "lease_expires_at": {"$gte": now}}},
+            {"$group": {"_id": "$email", "running": {"$sum": 1}}},
+            {"$match": {"running": {"$gte": settings.JOB_MAX_RUNNING_PER_USER}}},
+        ]
+        return [doc["_id"] async for doc in self.collection.aggregate(pipeline)]
+
+    async def _delete_inputs(self, job: dict):
+        """Input images are only needed until the job finishes; results live on in the job."""
+        if "items" not in job:
+            job = await self.collection.find_one({"_id": job["_id"]}, {"items": 1}) or {}
+        for item in job.get("items", []):
+            if item.get("blob_id"):
+                await blob_store.delete(item["blob_id"])
+
+
+# Singleton instance
+job_queue = JobQueue()
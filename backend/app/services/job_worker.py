@@ -0,0 +1,95 @@
+import asyncio
+import logging
+from typing import List, Optional
+
+from app.core.config import settings
+from app.db.blob_store import blob_store
+from app.services.job_queue import job_queue
+from app.services.prediction_service import prediction_service
+
+logger = logging.getLogger(__name__)
+
+
+class JobWorker:
+    """
+    Works through queued jobs in this process, `concurrency` jobs at a time.
+
+    Images are scored in chunks of BATCH_MAX_SIZE through the same decode pool,
+    prediction cache and batched inference as /predict/batch, and each chunk's
+    results are recorded (renewing the lease) before the next one starts.
+    Runs inside `python -m app.cli.job_worker`, or in the API process itself when
+    JOB_EMBEDDED_WORKERS is set.
+    """
+
+    def __init__(self, concurrency: int = 1):
+        self.concurrency = max(1, concurrency)
+        self.worker_id = job_queue.new_worker_id()
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._run()) for _ in range(self.concurrency)]
+            logger.info(f"Job worker {self.worker_id} started with concurrency {self.concurrency}")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _run(self):
+        while True:
+            try:
+                job = await job_queue.claim(self.worker_id)
+            except Exception as e:
+                logger.error(f"Failed to claim a job: {e}")
+                job = None
+            if job is None:
+                await asyncio.sleep(settings.JOB_POLL_INTERVAL_SECONDS)
+                continue
+            try:
+                await self.process(job)
+            except Exception as e:
+                # Even recording the failure failed (MongoDB down); the lease expiring hands the job back
+                logger.error(f"Job {job['_id']} could not be processed or released: {e}")
+                await asyncio.sleep(settings.JOB_POLL_INTERVAL_SECONDS)
+
+    async def process(self, job: dict):
+        items = job["items"]
+        logger.info(f"Processing job {job['_id']} from image {job['processed']} of {len(items)} (attempt {job['attempts']})")
+        try:
+            for start in range(job["processed"], len(items), settings.BATCH_MAX_SIZE):
+                results, model_version = await self._score(items[start:start + settings.BATCH_MAX_SIZE])
+                if not await job_queue.record_progress(job, self.worker_id, results, model_version):
+                    logger.warning(f"Job {job['_id']} was cancelled or taken over by another worker; stopping")
+                    return
+            await job_queue.complete(job, self.worker_id)
+            logger.info(f"Finished job {job['_id']}")
+        except asyncio.CancelledError:
+            # Shutting down: hand the job back now instead of making it wait out the lease
+            await job_queue.release(job, self.worker_id)
+            raise
+        except Exception as e:
+            logger.error(f"Job {job['_id']} failed on attempt {job['attempts']}: {e}")
+            await job_queue.fail(job, self.worker_id, str(e))
+
+    async def _score(self, chunk: List[dict]):
+        """Scores one chunk of job items; returns a result row per item plus the model version."""
+        results = [{"filename": item["filename"], "age": None, "confidence": None, "error": item.get("error")} for item in chunk]
+        pending = [i for i, item in enumerate(chunk) if item.get("error") is None]
+        contents: List[Optional[bytes]] = await asyncio.gather(*(blob_store.get(chunk[i]["blob_id"]) for i in pending))
+        images = []
+        for i, content in zip(pending, contents):
+            if content is None:
+                results[i]["error"] = "Input image is missing"
+            else:
+                images.append((i, content))
+
+        predictions, model_version = await prediction_service.predict_batch([content for _, content in images])
+        for (i, _), prediction in zip(images, predictions):
+            if isinstance(prediction, Exception):
+                results[i]["error"] = str(prediction)
+            else:
+                results[i]["age"], confidence = prediction
+                results[i]["confidence"] = round(confidence, 2)
+        return results, model_version
@@ -0,0 +1,93 @@
+import hashlib
+import logging
+from datetime import datetime
+from typing import Optional, Tuple
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.db.database import get_db_collection
+
+logger = logging.getLogger(__name__)
+
+
+class PredictionCache:
+    """
+    Content-addressed cache of (age, confidence) results.
+
+    Keys are a SHA-256 of the raw upload plus the model version, so a new model
+    never serves stale results. Lookups hit an in-process LRU first and then,
+    when enabled, a MongoDB collection shared by all workers.
+    """
+
+    def __init__(self):
+        self.local = TTLCache(settings.PREDICTION_CACHE_MAX_ENTRIES, settings.PREDICTION_CACHE_TTL_SECONDS)
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(image_bytes: bytes, model_version: str) -> str:
+        return f"{hashlib.sha256(image_bytes).hexdigest()}:{model_version}"
+
+    @property
+    def shared(self):
+        """The MongoDB tier, or None when disabled or not connected."""
+        if not settings.PREDICTION_CACHE_SHARED:
+            return None
+        return get_db_collection("prediction_cache")
+
+    async def ensure_indexes(self):
+        if self.shared is not None:
+            await self.shared.create_index("created_at", expireAfterSeconds=settings.PREDICTION_CACHE_TTL_SECONDS)
+
+    async def get(self, key: str) -> Optional[Tuple[int, float]]:
+        if not settings.PREDICTION_CACHE_ENABLED:
+            return None
+        value = self.local.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        if self.shared is not None:
+            try:
+                doc = await self.shared.find_one({"_id": key})
+            except Exception as e:
+                logger.warning(f"Shared prediction cache lookup failed: {e}")
+                doc = None
+            if doc:
+                value = (doc["age"], doc["confidence"])
+                self.local.set(key, value)
+                self.shared_hits += 1
+                return value
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: Tuple[int, float]):
+        if not settings.PREDICTION_CACHE_ENABLED:
+            return
+        self.local.set(key, value)
+        if self.shared is not None:
+            try:
+                await self.shared.update_one(
+                    {"_id": key},
+                    {"$set": {"age": value[0], "confidence": value[1], "created_at": datetime.utcnow()}},
+                    upsert=True,
+                )
+            except Exception as e:
+                logger.warning(f"Shared prediction cache write failed: {e}")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.shared_hits + self.misses
+        return {
+            "enabled": settings.PREDICTION_CACHE_ENABLED,
+            "shared": settings.PREDICTION_CACHE_SHARED,
+            "entries": len(self.local),
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.shared_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+# Singleton instance
+prediction_cache = PredictionCache()
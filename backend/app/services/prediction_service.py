@@ -1,69 +1,230 @@
-from PIL import Image
+import asyncio
 import numpy as np
-import io
-import base64
-from typing import Tuple, Optional
+from typing import List, Tuple, Optional, Union
 import logging
-from app.model.loader import load_model
-from app.schemas.user_schemas import UserInDB, HistoryItem
+from app.core.config import settings
+from app.model.backends import InferenceBackend
+from app.model.registry import model_registry
+from app.schemas.user_schemas import UserPrincipal
 from app.services.user_service import user_service
+from app.services.batching import MicroBatcher
+from app.services.preprocessing import BatchBufferPool, decode_image, decode_images, decode_tensor, normalize_batch
+from app.core.executors import executors
+from app.core.metrics import PREDICTIONS, STAGE_SECONDS
+from app.services.prediction_cache import prediction_cache
 
 logger = logging.getLogger(__name__)
 
 class PredictionService:
     def __init__(self):
-        self.model = load_model()
+        self.buffers = BatchBufferPool(settings.BATCH_MAX_SIZE, settings.MODEL_INPUT_SIZE)
+        self.batcher = MicroBatcher(
+            self._predict_rows,
+            max_batch_size=settings.BATCH_MAX_SIZE,
+            max_wait_ms=settings.BATCH_MAX_WAIT_MS,
+            executor=lambda: executors.inference_executor,
+            max_concurrent_batches=settings.INFERENCE_WORKERS,
+        )
     
-    async def predict_age(self, image_bytes: bytes, current_user: Optional[UserInDB] = None) -> Tuple[int, float]:
+    @property
+    def backend(self):
+        return model_registry.get()
+
+    @property
+    def model(self):
+        return self.backend.model
+
+    @property
+    def image_shape(self) -> Tuple[int, int, int]:
+        """(H, W, C) of one model input, as reported by `get_model_info` when the model knows it."""
+        shape = self.get_model_info()["input_shape"]
+        if isinstance(shape, (tuple, list)) and len(shape) == 4 and all(isinstance(dim, int) for dim in shape[1:]):
+            return tuple(shape[1:])
+        return (settings.MODEL_INPUT_SIZE, settings.MODEL_INPUT_SIZE, 3)
+
+    async def predict_age(self, image_bytes: bytes, current_user: Optional[UserPrincipal] = None) -> Tuple[int, float, str]:
         """
         Process image, predict age, and optionally save to user history.
+        Returns (age, confidence, model version).
         """
         try:
-            processed_image = await self._preprocess_image(image_bytes)
-            
-            # --- Model prediction logic ---
-            predictions = self.model.predict(processed_image, verbose=0)
-            if len(predictions.shape) > 1 and predictions.shape[1] == 1:
-                age = float(predictions[0][0])
+            # Looked up under the version serving now; after a hot swap the batch may run on the
+            # next one, and the result is labelled and cached under the version that scored it
+            model_version = model_registry.version()
+            cache_key = prediction_cache.key(image_bytes, model_version)
+            cached = await prediction_cache.get(cache_key)
+            if cached is not None:
+                predicted_age, confidence = cached
+                PREDICTIONS.inc(source="cache")
             else:
-                age = float(predictions[0])
+                predicted_age, confidence, scored_version = await self._predict_uncached(image_bytes)
+                if scored_version != model_version:
+                    model_version = scored_version
+                    cache_key = prediction_cache.key(image_bytes, model_version)
+                await prediction_cache.set(cache_key, (predicted_age, confidence))
+                PREDICTIONS.inc(source="model")
 
-            # Get confidence from the model's output
-            confidence = self._calculate_confidence(predictions)
-            predicted_age = int(max(0, age))
-
-            # If a user is logged in, save the result to their history
+            # If a user is logged in, save the result to their history (cache hits included)
             if current_user:
-                try:
-                    image_base64_str = f"data:image/jpeg;base64,{base64.b64encode(image_bytes).decode('utf-8')}"
-                    
-                    history_item = HistoryItem(
-                        image_base64=image_base64_str,
-                        predicted_age=predicted_age,
-                        confidence=confidence  # <-- ADD THIS LINE
-                    )
-                    user_service.add_prediction_to_history(current_user.email, history_item)
-                    logger.info(f"Saved prediction history for user: {current_user.email}")
-                except Exception as e:
-                    logger.error(f"Failed to save history for user {current_user.email}: {e}")
+                self._save_history(current_user, image_bytes, predicted_age, confidence, model_version)
 
-            return predicted_age, float(confidence)
+            return predicted_age, float(confidence), model_version
             
         except Exception as e:
             logger.error(f"Error in age prediction: {str(e)}")
             raise ValueError(f"Failed to process image: {str(e)}")
+
+    async def predict_frame(self, image_bytes: bytes) -> Tuple[int, float, str]:
+        """
+        Scores one live video frame and returns (age, confidence, model version).
+        Frames never repeat, so the prediction cache is skipped; history is left to the caller.
+        """
+        predicted_age, confidence, model_version = await self._predict_uncached(image_bytes)
+        PREDICTIONS.inc(source="model")
+        return predicted_age, confidence, model_version
+
+    async def _predict_uncached(self, image_bytes: bytes) -> Tuple[int, float, str]:
+        """Scores one image through the micro-batcher; returns (age, confidence, version of the model that scored it)."""
+        async with executors.inflight():
+            pixels = await self._preprocess_image(image_bytes)
+            
+            # --- Model prediction logic ---
+            row, model_version = await self.batcher.submit(pixels)
+
+        # The batcher returns this image's row; restore the batch axis for the parsing below
+        return (*self._parse_predictions(np.expand_dims(row, axis=0)), model_version)
+
+    def _parse_predictions(self, predictions: np.ndarray) -> Tuple[int, float]:
+        """Turns a single-image (1, ...) model output into (age, confidence)."""
+        if len(predictions.shape) > 1 and predictions.shape[1] == 1:
+            age = float(predictions[0][0])
+        else:
+            age = float(predictions[0])
+
+        # Get confidence from the model's output
+        confidence = self._calculate_confidence(predictions)
+        return int(max(0, age)), float(confidence)
+
+    async def predict_batch(
+        self,
+        images: List[bytes],
+        current_user: Optional[UserPrincipal] = None
+    ) -> Tuple[List[Union[Tuple[int, float], Exception]], str]:
+        """
+        Predicts ages for many images with one decode pass and one model call.
+        Returns an (age, confidence) tuple or the item's exception per image, in input
+        order, plus the model version that scored them.
+        Successful results are saved to the user's history in a single bulk write.
+        """
+        # Pinned for the whole batch, so a hot reload can't split it across versions
+        backend = self.backend
+        cache_keys = [prediction_cache.key(image_bytes, backend.version) for image_bytes in images]
+        results: List[Union[Tuple[int, float], Exception, None]] = [await prediction_cache.get(key) for key in cache_keys]
+        pending = [i for i, result in enumerate(results) if result is None]
+        if len(pending) < len(images):
+            PREDICTIONS.inc(len(images) - len(pending), source="cache")
+
+        if pending:
+            async with executors.inflight():
+                decoded = await self._preprocess_many([images[i] for i in pending])
+                valid = []
+                for i, pixels in zip(pending, decoded):
+                    if isinstance(pixels, Exception):
+                        results[i] = pixels
+                    else:
+                        valid.append((i, pixels))
+                if valid:
+                    predicted = await executors.run_inference(self.predict_decoded, [pixels for _, pixels in valid], backend)
+                    for result, (i, _) in zip(predicted, valid):
+                        results[i] = result
+                        await prediction_cache.set(cache_keys[i], result)
+                    PREDICTIONS.inc(len(valid), source="model")
+
+        if current_user:
+            entries = [(images[i], *result) for i, result in enumerate(results) if not isinstance(result, Exception)]
+            if entries:
+                try:
+                    user_service.add_predictions_to_history(current_user.email, entries, backend.version)
+                except Exception as e:
+                    logger.error(f"Failed to save batch history for user {current_user.email}: {e}")
+        return results, backend.version
+
+    async def predict_tensor(self, data: bytes) -> Tuple[List[Tuple[int, float]], str]:
+        """
+        Predicts ages for already-decoded uint8 pixels (a .npy array or length-prefixed
+        buffer, see `decode_tensor`) without touching PIL or the preprocessing pool.
+        Returns an (age, confidence) tuple per image plus the model version.
+        Results are neither cached nor saved to history, which stores encoded images.
+        """
+        images = decode_tensor(data, self.image_shape)
+        if len(images) > settings.MAX_BATCH_FILES:
+            raise ValueError(f"Too many images: {len(images)}. Maximum per batch: {settings.MAX_BATCH_FILES}")
+        async with executors.inflight():
+            if len(images) == 1:
+                # Lone images join the micro-batcher like decoded uploads do
+                row, model_version = await self.batcher.submit(images[0])
+                results = [self._parse_predictions(np.expand_dims(row, axis=0))]
+            else:
+                backend = self.backend
+                model_version = backend.version
+                # The rows are views into the request body; normalization is their only copy
+                results = await executors.run_inference(self.predict_decoded, list(images), backend)
+        PREDICTIONS.inc(len(results), source="model")
+        return results, model_version
+
+    async def _preprocess_many(self, images: List[bytes]) -> List[object]:
+        """Decodes images in one chunk per preprocessing worker, preserving order."""
+        target_size = (settings.MODEL_INPUT_SIZE, settings.MODEL_INPUT_SIZE)
+        chunk_size = -(-len(images) // max(1, settings.PREPROCESS_WORKERS))
+        chunks = [images[i:i + chunk_size] for i in range(0, len(images), chunk_size)]
+        with STAGE_SECONDS.time(stage="decode"):
+            decoded = await asyncio.gather(*(executors.run_preprocess(decode_images, chunk, target_size) for chunk in chunks))
+        return [pixels for chunk in decoded for pixels in chunk]
+
+    def _save_history(self, current_user: UserPrincipal, image_bytes: bytes, predicted_age: int, confidence: float, model_version: str):
+        # Only enqueues; the history writer stores images and documents off the request path
+        try:
+            user_service.add_prediction_to_history(current_user.email, image_bytes, predicted_age, confidence, model_version)
+            logger.info(f"Queued prediction history for user: {current_user.email}")
+        except Exception as e:
+            logger.error(f"Failed to save history for user {current_user.email}: {e}")
     
+    def predict_decoded(self, images: List[np.ndarray], backend: Optional[InferenceBackend] = None) -> List[Tuple[int, float]]:
+        """
+        Synchronously predicts (age, confidence) for already-decoded uint8 images in one model call,
+        on `backend` or the currently active one.
+        Used by the batch endpoint and offline tools; call it from a worker thread, not the event loop.
+        """
+        predictions = self._predict_batch(images, backend)
+        return [self._parse_predictions(np.expand_dims(row, axis=0)) for row in predictions]
+
+    def _predict_rows(self, images: List[np.ndarray]) -> List[Tuple[np.ndarray, str]]:
+        """
+        Micro-batcher entry point: each image's output row paired with the version of the
+        backend that actually ran the batch, which a hot swap can make newer than the one
+        serving when the request arrived.
+        """
+        backend = self.backend
+        predictions = self._predict_batch(images, backend)
+        return [(row, backend.version) for row in predictions]
+
+    def _predict_batch(self, images: List[np.ndarray], backend: Optional[InferenceBackend] = None) -> np.ndarray:
+        """Normalizes decoded images into a pooled batch buffer and runs one model call."""
+        # Resolved once per batch: a batch in flight during a hot swap finishes on the old model
+        backend = backend or self.backend
+        with self.buffers.borrow() as buffer:
+            with STAGE_SECONDS.time(stage="preprocess"):
+                batch = normalize_batch(images, out=buffer)
+            with STAGE_SECONDS.time(stage="inference"):
+                return backend.predict(batch)
+
     async def _preprocess_image(self, image_bytes: bytes) -> np.ndarray:
-        # ... (this method remains unchanged)
+        # Decoding runs in the preprocessing pool so the event loop stays responsive.
+        # Workers return small uint8 arrays; normalization happens in the batch buffer.
         try:
-            image = Image.open(io.BytesIO(image_bytes))
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            target_size = (64, 64)
-            image = image.resize(target_size)
-            image_array = np.array(image, dtype=np.float32) / 255.0
-            image_array = np.expand_dims(image_array, axis=0)
-            return image_array
+            target_size = (settings.MODEL_INPUT_SIZE, settings.MODEL_INPUT_SIZE)
+            with STAGE_SECONDS.time(stage="decode"):
+                return await executors.run_preprocess(decode_image, image_bytes, target_size)
         except Exception as e:
             logger.error(f"Error preprocessing image: {str(e)}")
             raise ValueError("Invalid image format or corrupted image")
@@ -0,0 +1,202 @@
+from PIL import Image, ImageOps
+import numpy as np
+import io
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Optional, Sequence, Tuple
+
+# Kept free of app settings/model imports so worker processes can import it cheaply.
+
+_SCALE = np.float32(1.0 / 255.0)
+
+NPY_MAGIC = b"\x93NUMPY"
+TENSOR_CONTENT_TYPES = ("application/x-npy", "application/octet-stream")
+
+
+def decode_image(image_bytes: bytes, target_size: Tuple[int, int] = (64, 64)) -> np.ndarray:
+    """
+    Decodes raw image bytes into a (H, W, 3) uint8 array at the model's input size.
+    JPEGs are decoded at a reduced scale via `draft()`, so a large photo is never
+    materialized at full resolution. Runs inside the preprocessing pool, so it must
+    stay a picklable module-level function.
+    """
+    try:
+        image = Image.open(io.BytesIO(image_bytes))
+        # No-op for non-JPEG formats; picks the smallest DCT scale still >= target_size
+        image.draft('RGB', target_size)
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        if image.size != target_size:
+            image = image.resize(target_size, reducing_gap=3.0)
+        return np.asarray(image, dtype=np.uint8)
+    except Exception:
+        raise ValueError("Invalid image format or corrupted image")
+
+
+def decode_images(images_bytes: Sequence[bytes], target_size: Tuple[int, int] = (64, 64)) -> List[object]:
+    """
+    Decodes several images in one pool task. Failures are returned in place as
+    ValueError instances so one bad file doesn't sink the rest.
+    """
+    decoded = []
+    for image_bytes in images_bytes:
+        try:
+            decoded.append(decode_image(image_bytes, target_size))
+        except ValueError as e:
+            decoded.append(e)
+    return decoded
+
+
+def decode_chunk(items: Sequence[Tuple[str, bytes]], target_size: Tuple[int, int]) -> Tuple[List[tuple], float]:
+    """
+    Decodes (key, bytes) pairs for offline bulk scoring; returns (key, pixels or None,
+    error or None) per item plus the seconds spent. Runs in bulk_score's spawned workers.
+    """
+    started = time.perf_counter()
+    decoded = []
+    for key, image_bytes in items:
+        try:
+            decoded.append((key, decode_image(image_bytes, target_size), None))
+        except ValueError as e:
+            decoded.append((key, None, str(e)))
+    return decoded, time.perf_counter() - started
+
+
+def decode_tensor(data: bytes, image_shape: Tuple[int, int, int]) -> np.ndarray:
+    """
+    Maps already-decoded uint8 pixels onto an (N, H, W, C) array without copying them.
+
+    Accepts either a .npy file holding an (H, W, C) or (N, H, W, C) uint8 C-order array,
+    or a length-prefixed buffer: one or more records of a little-endian uint32 byte
+    count followed by that many bytes of one H x W x C image. Raises ValueError unless
+    every image matches `image_shape` exactly; nothing is resized.
+    """
+    if data.startswith(NPY_MAGIC):
+        stream = io.BytesIO(data)
+        version = np.lib.format.read_magic(stream)
+        try:
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(stream)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(stream)
+        except ValueError as e:
+            raise ValueError(f"Invalid .npy header: {e}")
+        if dtype != np.uint8 or fortran_order:
+            raise ValueError(f"Tensor must be a C-order uint8 array, got {dtype}{' (Fortran order)' if fortran_order else ''}")
+        if len(shape) == len(image_shape):
+            shape = (1,) + tuple(shape)
+        if len(shape) != len(image_shape) + 1 or tuple(shape[1:]) != tuple(image_shape):
+            raise ValueError(f"Tensor shape {shape} doesn't match the model input {image_shape}")
+        if shape[0] == 0:
+            raise ValueError("Truncated or empty tensor buffer")
+        count = int(np.prod(shape))
+        if len(data) - stream.tell() != count:
+            raise ValueError(f"Tensor data is {len(data) - stream.tell()} bytes, expected {count}")
+        return np.frombuffer(data, dtype=np.uint8, count=count, offset=stream.tell()).reshape(shape)
+
+    image_bytes = int(np.prod(image_shape))
+    offset, records = 0, 0
+    while offset < len(data):
+        if offset + 4 > len(data):
+            raise ValueError("Truncated length prefix")
+        (length,) = struct.unpack_from("<I", data, offset)
+        if length != image_bytes:
+            raise ValueError(f"Image {records} is {length} bytes; the model input {image_shape} needs {image_bytes}")
+        offset += 4 + length
+        records += 1
+    if offset != len(data) or records == 0:
+        raise ValueError("Truncated or empty tensor buffer")
+    # Records have a fixed size, so a strided view skips the prefixes without copying the pixels
+    height, width, channels = image_shape
+    return np.lib.stride_tricks.as_strided(
+        np.frombuffer(data, dtype=np.uint8, offset=4),
+        shape=(records, height, width, channels),
+        strides=(4 + image_bytes, width * channels, channels, 1),
+        writeable=False,
+    )
+
+
+def normalize_batch(images: Sequence[np.ndarray], out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Scales uint8 images to [0, 1] float32, writing straight into `out` (N, H, W, 3)
+    when it is large enough instead of allocating an intermediate per image.
+    """
+    if out is None or len(out) < len(images):
+        out = np.empty((len(images),) + images[0].shape, dtype=np.float32)
+    for i, pixels in enumerate(images):
+        np.multiply(pixels, _SCALE, out=out[i])
+    return out[:len(images)]
+
+
+def preprocess_batch(images_bytes: Sequence[bytes], target_size: Tuple[int, int] = (64, 64), out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Decodes and normalizes N images into one contiguous (N, H, W, 3) float32 array."""
+    if out is None or len(out) < len(images_bytes):
+        out = np.empty((len(images_bytes), target_size[1], target_size[0], 3), dtype=np.float32)
+    for i, image_bytes in enumerate(images_bytes):
+        np.multiply(decode_image(image_bytes, target_size), _SCALE, out=out[i])
+    return out[:len(images_bytes)]
+
+
+def preprocess_image(image_bytes: bytes, target_size: Tuple[int, int] = (64, 64)) -> np.ndarray:
+    """Decodes raw image bytes into a normalized (1, H, W, 3) float32 batch."""
+    return preprocess_batch([image_bytes], target_size)
+
+
+HISTORY_FORMATS = {"webp": ("WEBP", "image/webp"), "jpeg": ("JPEG", "image/jpeg")}
+
+
+def encode_history_image(image_bytes: bytes, max_size: int = 1024, thumbnail_size: int = 128,
+                         fmt: str = "webp", quality: int = 80) -> Tuple[bytes, str, bytes]:
+    """
+    Re-encodes an upload for history storage: EXIF orientation applied, longest side
+    capped at `max_size`, saved as WebP or JPEG at `quality`, plus a thumbnail that
+    fits `thumbnail_size` in the same format. The original is kept instead when it
+    already fits and re-encoding wouldn't make it smaller.
+    Returns (image bytes, its content type, thumbnail bytes).
+    """
+    pil_format, content_type = HISTORY_FORMATS[fmt]
+    image = Image.open(io.BytesIO(image_bytes))
+    original_format, original_size = image.format, image.size
+    rotated = image.getexif().get(0x0112, 1) != 1
+    # Decodes JPEGs at a reduced DCT scale when they are far larger than the cap
+    image.draft('RGB', (max_size, max_size))
+    image = ImageOps.exif_transpose(image)
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    image.thumbnail((max_size, max_size))
+    encoded = _encode(image, pil_format, quality)
+    if len(encoded) >= len(image_bytes) and max(original_size) <= max_size and not rotated and original_format in Image.MIME:
+        encoded, content_type = image_bytes, Image.MIME[original_format]
+
+    image.thumbnail((thumbnail_size, thumbnail_size))
+    return encoded, content_type, _encode(image, pil_format, quality)
+
+
+def _encode(image: Image.Image, pil_format: str, quality: int) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format=pil_format, quality=quality)
+    return buffer.getvalue()
+
+
+class BatchBufferPool:
+    """
+    Reusable float32 batch buffers, one per concurrently running batch, so the
+    inference path doesn't allocate a fresh input array for every call.
+    """
+
+    def __init__(self, max_batch_size: int, image_size: int):
+        self.shape = (max_batch_size, image_size, image_size, 3)
+        self._free: List[np.ndarray] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def borrow(self):
+        with self._lock:
+            buffer = self._free.pop() if self._free else np.empty(self.shape, dtype=np.float32)
+        try:
+            yield buffer
+        finally:
+            with self._lock:
+                self._free.append(buffer)
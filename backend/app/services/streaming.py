@@ -0,0 +1,57 @@
+import asyncio
+import statistics
+from collections import deque
+from typing import Deque, Optional, Tuple
+
+from app.core.metrics import STREAM_FRAMES
+
+
+class FrameSession:
+    """
+    Per-connection state of a live webcam stream.
+
+    Only the newest unscored frame is kept: a frame that arrives while the previous
+    one is still waiting replaces it, so a client sending faster than inference can
+    keep up sees fresh results instead of a growing backlog. Predictions are smoothed
+    over the last `window` scored frames (median age, mean confidence).
+    """
+
+    def __init__(self, window: int):
+        self._latest: Optional[bytes] = None
+        self._arrived = asyncio.Event()
+        self._ages: Deque[int] = deque(maxlen=max(1, window))
+        self._confidences: Deque[float] = deque(maxlen=max(1, window))
+        self.received = 0
+        self.dropped = 0
+        # (frame bytes, smoothed age, smoothed confidence, model version) of the last scored frame, kept for captures
+        self.last_result: Optional[Tuple[bytes, int, float, str]] = None
+
+    def push(self, frame: bytes):
+        self.received += 1
+        if self._latest is not None:
+            self.dropped += 1
+            STREAM_FRAMES.inc(result="dropped")
+        self._latest = frame
+        self._arrived.set()
+
+    async def next_frame(self) -> Tuple[int, bytes]:
+        """Waits for a frame and returns (sequence number, frame bytes) of the newest one."""
+        await self._arrived.wait()
+        self._arrived.clear()
+        frame, self._latest = self._latest, None
+        return self.received, frame
+
+    def observe(self, frame: bytes, age: int, confidence: float, model_version: str) -> Tuple[int, float]:
+        """Adds a scored frame to the window and returns the smoothed (age, confidence)."""
+        self._ages.append(age)
+        self._confidences.append(confidence)
+        smoothed_age = int(round(statistics.median(self._ages)))
+        smoothed_confidence = statistics.fmean(self._confidences)
+        self.last_result = (frame, smoothed_age, smoothed_confidence, model_version)
+        return smoothed_age, smoothed_confidence
+
+    def reset(self):
+        """Forgets the smoothing window, e.g. when a different person steps in front of the camera."""
+        self._ages.clear()
+        self._confidences.clear()
+        self.last_result = None
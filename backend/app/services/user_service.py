@@ -1,46 +1,178 @@
-from typing import Optional
+import base64
+import logging
+from datetime import datetime
+from typing import List, Optional, Tuple
 from uuid import UUID
+from pymongo import ASCENDING, DESCENDING
 from app.db.database import get_db_collection
-from app.schemas.user_schemas import UserInDB, HistoryItem
+from app.db.blob_store import blob_store
+from app.schemas.user_schemas import UserInDB, UserPrincipal, HistoryItem
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.metrics import HISTORY_ENTRIES
+from app.core.executors import executors
 from app.core.hashing import verify_password
+from app.services.history_images import history_images
+from app.services.history_stats import history_stats
+from app.services.history_writer import PendingHistory, history_writer
+
+logger = logging.getLogger(__name__)
 
 class UserService:
     def __init__(self):
-        self.collection = get_db_collection("users")
+        self.principals = TTLCache(settings.PRINCIPAL_CACHE_MAX_ENTRIES, settings.PRINCIPAL_CACHE_TTL_SECONDS)
+
+    # Looked up per call: collections only exist once the lifespan has connected
+    @property
+    def collection(self):
+        return get_db_collection("users")
+
+    @property
+    def history(self):
+        return get_db_collection("history")
 
-    # ... (get_user_by_email and authenticate_user remain the same)
-    def get_user_by_email(self, email: str) -> Optional[UserInDB]:
-        user_data = self.collection.find_one({"email": email})
+    async def ensure_indexes(self):
+        # The id suffix makes the sort order total, which keyset pagination relies on
+        await self.history.create_index([("email", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)])
+        await self.history.create_index("id", unique=True)
+
+    async def get_user_by_email(self, email: str) -> Optional[UserInDB]:
+        # Users migrated from the embedded-history layout may still carry a history array; never load it
+        user_data = await self.collection.find_one({"email": email}, {"history": 0})
         if user_data:
             return UserInDB(**user_data)
         return None
 
-    def authenticate_user(self, email: str, password: str) -> Optional[UserInDB]:
-        user = self.get_user_by_email(email)
-        if not user or not verify_password(password, user.hashed_password):
+    async def get_principal(self, email: str) -> Optional[UserPrincipal]:
+        """
+        Returns the user's identity and flags for auth checks, served from a short-TTL cache.
+        Users are only changed outside the API (there is no password or disable route), so a
+        disabled flag set in the database takes effect within PRINCIPAL_CACHE_TTL_SECONDS.
+        """
+        principal = self.principals.get(email)
+        if principal is not None:
+            return principal
+        user_data = await self.collection.find_one({"email": email}, {"_id": 0, "email": 1, "disabled": 1, "is_admin": 1})
+        if not user_data:
+            return None
+        principal = UserPrincipal(**user_data)
+        self.principals.set(email, principal)
+        return principal
+
+    async def authenticate_user(self, email: str, password: str) -> Optional[UserInDB]:
+        user = await self.get_user_by_email(email)
+        # bcrypt is deliberately slow; run it in the bounded hashing pool, never on the event loop
+        if not user or not await executors.run_hashing(verify_password, password, user.hashed_password):
             return None
         return user
     
-    def add_prediction_to_history(self, email: str, history_item: HistoryItem):
-        history_data = history_item.dict()
-        # Convert UUID to string for MongoDB storage
-        history_data['id'] = str(history_data['id'])
-        self.collection.update_one(
-            {"email": email},
-            {"$push": {"history": history_data}}
+    def add_prediction_to_history(self, email: str, image_bytes: bytes, predicted_age: int, confidence: float,
+                                  model_version: Optional[str] = None) -> HistoryItem:
+        """
+        Records a history entry for the prediction. Blob ids are allocated now; the image,
+        thumbnail and document are written in bulk by the history writer.
+        """
+        return self.add_predictions_to_history(email, [(image_bytes, predicted_age, confidence)], model_version)[0]
+
+    def add_predictions_to_history(self, email: str, entries: List[Tuple[bytes, int, float]],
+                                   model_version: Optional[str] = None) -> List[HistoryItem]:
+        """
+        Records several (image bytes, predicted age, confidence) entries, enqueued together
+        so they land in the same bulk insert.
+        """
+        items, pending = [], []
+        for image_bytes, predicted_age, confidence in entries:
+            history_item = HistoryItem(
+                image_id=blob_store.new_id(),
+                thumbnail_id=blob_store.new_id(),
+                predicted_age=predicted_age,
+                confidence=confidence,
+                model_version=model_version
+            )
+            history_data = history_item.dict()
+            # Convert UUID to string for MongoDB storage
+            history_data['id'] = str(history_data['id'])
+            history_data['email'] = email
+            items.append(history_item)
+            pending.append(PendingHistory(doc=history_data, image_bytes=image_bytes))
+        history_writer.enqueue(pending)
+        HISTORY_ENTRIES.inc(len(pending), status="queued")
+        return items
+
+    async def get_history_page(self, email: str, limit: int, cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+        """
+        Returns up to `limit` history entries (newest first) after `cursor`, plus the cursor for the next page.
+        Only metadata fields are read; image bytes stay in the blob store.
+        """
+        query = {"email": email}
+        if cursor:
+            created_at, item_id = self._decode_cursor(cursor)
+            query["$or"] = [
+                {"created_at": {"$lt": created_at}},
+                {"created_at": created_at, "id": {"$lt": item_id}},
+            ]
+        projection = {"_id": 0, "id": 1, "predicted_age": 1, "confidence": 1, "model_version": 1, "created_at": 1}
+        docs = await (
+            self.history.find(query, projection)
+            .sort([("created_at", DESCENDING), ("id", DESCENDING)])
+            .limit(limit + 1)
+            .to_list(length=limit + 1)
+        )
+        next_cursor = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            next_cursor = self._encode_cursor(docs[-1]["created_at"], docs[-1]["id"])
+        return docs, next_cursor
+
+    @staticmethod
+    def _encode_cursor(created_at: datetime, item_id: str) -> str:
+        raw = f"{created_at.isoformat()}|{item_id}".encode()
+        return base64.urlsafe_b64encode(raw).decode()
+
+    @staticmethod
+    def _decode_cursor(cursor: str) -> Tuple[datetime, str]:
+        try:
+            created_at, item_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+            return datetime.fromisoformat(created_at), item_id
+        except Exception:
+            raise ValueError("Invalid pagination cursor")
+
+    async def get_history_image_ref(self, email: str, item_id: UUID, thumbnail: bool = False) -> Optional[Tuple[str, str]]:
+        """
+        Returns (blob id, content type) of a history item's image or thumbnail, or None if not found.
+        """
+        doc = await self.history.find_one(
+            {"email": email, "id": str(item_id)},
+            {"image_id": 1, "thumbnail_id": 1, "content_type": 1, "thumbnail_content_type": 1}
         )
+        if not doc:
+            return None
+        if thumbnail and doc.get("thumbnail_id"):
+            return doc["thumbnail_id"], doc.get("thumbnail_content_type", "image/jpeg")
+        return doc["image_id"], doc.get("content_type", "image/jpeg")
 
-    # --- New Delete Function ---
-    def delete_history_item(self, email: str, item_id: UUID) -> bool:
+    async def delete_history_item(self, email: str, item_id: UUID) -> bool:
         """
-        Deletes a single history item for a user by its ID.
+        Deletes a single history item for a user by its ID. Its stored images are freed
+        once no other history item shares them.
         Returns True if an item was deleted, False otherwise.
         """
-        result = self.collection.update_one(
-            {"email": email},
-            {"$pull": {"history": {"id": str(item_id)}}}
-        )
-        return result.modified_count > 0
+        doc = await self.history.find_one_and_delete({"email": email, "id": str(item_id)})
+        if not doc:
+            return False
+        if doc.get("content_key"):
+            await history_images.release(doc["content_key"])
+        else:
+            # Stored before deduplication; the blobs belong to this item alone
+            for blob_id in (doc.get("image_id"), doc.get("thumbnail_id")):
+                if blob_id:
+                    await blob_store.delete(blob_id)
+        try:
+            await history_stats.record_deleted([doc])
+        except Exception as e:
+            # The item is gone; only the aggregates are off until the next rebuild
+            logger.error(f"Failed to update history stats after deleting item {item_id}: {e}")
+        return True
 
 # Singleton instance
 user_service = UserService()
@@ -0,0 +1,101 @@
+"""
+Compares the original single-image preprocessing path with the draft-mode,
+buffer-reusing pipeline in app/services/preprocessing.py.
+
+Run from the backend directory:
+    python -m benchmarks.bench_preprocess [--iterations 50]
+"""
+import argparse
+import io
+import multiprocessing
+import resource
+import time
+
+import numpy as np
+from PIL import Image
+
+from app.services.preprocessing import BatchBufferPool, decode_image, normalize_batch, preprocess_batch
+from benchmarks.fixtures import make_image
+
+TARGET_SIZE = (64, 64)
+RESOLUTIONS = [(640, 480), (1920, 1080), (4000, 3000)]
+
+
+def legacy_preprocess(image_bytes: bytes) -> np.ndarray:
+    """The preprocessing path as it was before the pipeline rewrite."""
+    image = Image.open(io.BytesIO(image_bytes))
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    image = image.resize(TARGET_SIZE)
+    image_array = np.array(image, dtype=np.float32) / 255.0
+    return np.expand_dims(image_array, axis=0)
+
+
+def pipeline_preprocess(image_bytes: bytes, pool: BatchBufferPool) -> np.ndarray:
+    with pool.borrow() as buffer:
+        return normalize_batch([decode_image(image_bytes, TARGET_SIZE)], out=buffer)
+
+
+def _reset_peak_rss() -> bool:
+    """Resets the kernel's RSS high-water mark (Linux >= 4.0); returns False where unsupported."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_kb() -> int:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _run_variant(variant: str, image_bytes: bytes, iterations: int, results):
+    pool = BatchBufferPool(1, TARGET_SIZE[0])
+    fn = legacy_preprocess if variant == "legacy" else (lambda b: pipeline_preprocess(b, pool))
+    fn(image_bytes)  # first call pays import/allocation costs
+    _reset_peak_rss()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn(image_bytes)
+    elapsed = time.perf_counter() - started
+    results.put((elapsed / iterations * 1000, _peak_rss_kb()))
+
+
+def measure(variant: str, image_bytes: bytes, iterations: int):
+    # Each variant runs in a freshly spawned process so peak RSS isn't shared between them
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=_run_variant, args=(variant, image_bytes, iterations, results))
+    process.start()
+    outcome = results.get()
+    process.join()
+    return outcome
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'resolution':>12} {'variant':>9} {'ms/image':>9} {'peak RSS MB':>12}")
+    for width, height in RESOLUTIONS:
+        image_bytes = make_image(width, height, "JPEG")
+        legacy = legacy_preprocess(image_bytes)
+        pipeline = preprocess_batch([image_bytes], TARGET_SIZE)
+        drift = float(np.max(np.abs(legacy - pipeline)))
+        for variant in ("legacy", "pipeline"):
+            ms, peak_kb = measure(variant, image_bytes, args.iterations)
+            print(f"{f'{width}x{height}':>12} {variant:>9} {ms:>9.2f} {peak_kb / 1024:>12.1f}")
+        print(f"{'':>12} max pixel drift vs legacy: {drift:.3f}")
+
+
+if __name__ == "__main__":
+    main()
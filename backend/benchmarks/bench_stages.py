@@ -0,0 +1,134 @@
+"""
+Per-stage micro-benchmarks of the prediction path: decode, resize, normalize,
+infer and history write, each timed in isolation against the offline stand-ins.
+"""
+import asyncio
+import io
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+from PIL import Image
+
+from benchmarks import offline  # noqa: F401  (must be imported before the app)
+from benchmarks.fixtures import fixture_set, unique_images
+from benchmarks.report import summarize
+
+from app.core.config import settings
+from app.db.database import mongodb
+from app.model.registry import model_registry
+from app.services.history_writer import history_writer
+from app.services.preprocessing import BatchBufferPool, normalize_batch
+from app.services.user_service import user_service
+
+BATCH_SIZES = [1, 8, 32]
+HISTORY_BATCH_SIZES = [1, 16, 64]
+
+
+def time_calls(fn: Callable[[], object], iterations: int, warmup: int = 2) -> List[float]:
+    for _ in range(warmup):
+        fn()
+    latencies = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def _open_draft(image_bytes: bytes, target_size) -> Image.Image:
+    # The decode half of decode_image(): draft-mode JPEG decoding, full decoding for the rest
+    image = Image.open(io.BytesIO(image_bytes))
+    image.draft('RGB', target_size)
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    image.load()
+    return image
+
+
+def bench_decode_resize(fixtures: Dict[str, bytes], iterations: int) -> Dict[str, Dict]:
+    target_size = (settings.MODEL_INPUT_SIZE, settings.MODEL_INPUT_SIZE)
+    results = {}
+    for name, image_bytes in fixtures.items():
+        results[f"decode/{name}"] = summarize(time_calls(lambda: _open_draft(image_bytes, target_size), iterations))
+    for name, image_bytes in fixtures.items():
+        decoded = _open_draft(image_bytes, target_size)
+        results[f"resize/{name}"] = summarize(time_calls(lambda: decoded.resize(target_size, reducing_gap=3.0), iterations))
+    return results
+
+
+def _decoded_batch(size: int) -> List[np.ndarray]:
+    rng = np.random.default_rng(size)
+    shape = (settings.MODEL_INPUT_SIZE, settings.MODEL_INPUT_SIZE, 3)
+    return [rng.integers(0, 256, shape, dtype=np.uint8) for _ in range(size)]
+
+
+def bench_normalize(iterations: int) -> Dict[str, Dict]:
+    pool = BatchBufferPool(max(BATCH_SIZES), settings.MODEL_INPUT_SIZE)
+    results = {}
+    for size in BATCH_SIZES:
+        images = _decoded_batch(size)
+
+        def run():
+            with pool.borrow() as buffer:
+                normalize_batch(images, out=buffer)
+
+        results[f"normalize/batch{size}"] = summarize(time_calls(run, iterations), items=iterations * size)
+    return results
+
+
+def bench_infer(iterations: int) -> Dict[str, Dict]:
+    backend = model_registry.get()
+    results = {}
+    for size in BATCH_SIZES:
+        batch = normalize_batch(_decoded_batch(size))
+        results[f"infer/batch{size}"] = summarize(time_calls(lambda: backend.predict(batch), iterations), items=iterations * size)
+    return results
+
+
+async def bench_history_write(fixtures: Dict[str, bytes], iterations: int) -> Dict[str, Dict]:
+    """
+    Enqueue plus flush of N entries, in two cases:
+    - fresh: every entry a new image, so each is re-encoded, gets a thumbnail and two blob
+      writes before the one insert_many;
+    - dedup: the same image every time, so past the first round each entry only bumps the
+      stored copy's reference count.
+    """
+    await mongodb.connect()
+    await user_service.ensure_indexes()
+    image_bytes = fixtures[next(name for name in fixtures if name.startswith("JPEG"))]
+    width, height = Image.open(io.BytesIO(image_bytes)).size
+    results = {}
+    next_seed = 1_000
+    try:
+        for size in HISTORY_BATCH_SIZES:
+            # Generated up front so encoding the fixtures isn't timed
+            fresh = unique_images(size * (iterations + 1), width, height, first_seed=next_seed)
+            next_seed += len(fresh)
+            cases = {
+                "fresh": [fresh[i * size:(i + 1) * size] for i in range(iterations + 1)],
+                "dedup": [[image_bytes] * size] * (iterations + 1),
+            }
+            for case, rounds in cases.items():
+                latencies = []
+                for i, images in enumerate(rounds):
+                    started = time.perf_counter()
+                    user_service.add_predictions_to_history("bench@example.com", [(image, 30, 0.9) for image in images])
+                    await history_writer.flush()
+                    if i:  # the first round warms the pools (and, for dedup, stores the one copy)
+                        latencies.append((time.perf_counter() - started) * 1000)
+                results[f"history_write/{case}/batch{size}"] = summarize(latencies, items=iterations * size)
+    finally:
+        await history_writer.stop()
+        mongodb.close()
+    return results
+
+
+def run_stages(iterations: int) -> Dict[str, Dict]:
+    fixtures = fixture_set()
+    results = {}
+    results.update(bench_decode_resize(fixtures, iterations))
+    results.update(bench_normalize(iterations))
+    results.update(bench_infer(iterations))
+    results.update(asyncio.run(bench_history_write(fixtures, max(1, iterations // 4))))
+    return results
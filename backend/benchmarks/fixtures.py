@@ -0,0 +1,44 @@
+"""
+Deterministic image fixtures for the benchmarks.
+
+Images are generated from a seed rather than checked in, so every run (and every
+machine) scores exactly the same bytes.
+"""
+import io
+from typing import Dict, List, Tuple
+
+import numpy as np
+from PIL import Image
+
+FORMATS = ["JPEG", "PNG", "WEBP"]
+RESOLUTIONS = [(320, 240), (1280, 720), (2592, 1944)]
+
+
+def make_image(width: int, height: int, fmt: str = "JPEG", seed: int = 0) -> bytes:
+    """Encodes a photo-like test image: smooth gradients plus seeded noise."""
+    rng = np.random.default_rng(seed * 1_000_003 + width * height)
+    # Smooth gradients plus noise compress like a photo rather than like flat colour
+    y, x = np.mgrid[0:height, 0:width]
+    base = np.stack([x * 255 // width, y * 255 // height, (x + y) * 127 // (width + height)], axis=-1)
+    pixels = np.clip(base + rng.integers(-20, 20, base.shape), 0, 255).astype(np.uint8)
+    buffer = io.BytesIO()
+    options = {"JPEG": {"quality": 90}, "WEBP": {"quality": 90}, "PNG": {"compress_level": 6}}[fmt]
+    Image.fromarray(pixels).save(buffer, format=fmt, **options)
+    return buffer.getvalue()
+
+
+def fixture_set(formats: List[str] = FORMATS, resolutions: List[Tuple[int, int]] = RESOLUTIONS) -> Dict[str, bytes]:
+    """Returns {"JPEG-1280x720": bytes, ...} for every format/resolution pair."""
+    return {
+        f"{fmt}-{width}x{height}": make_image(width, height, fmt)
+        for fmt in formats
+        for width, height in resolutions
+    }
+
+
+def unique_images(count: int, width: int = 640, height: int = 480, fmt: str = "JPEG", first_seed: int = 1) -> List[bytes]:
+    """
+    `count` distinct images of one size, so a load test isn't served from the prediction
+    cache. Calls with non-overlapping seed ranges never repeat an image.
+    """
+    return [make_image(width, height, fmt, seed=first_seed + i) for i in range(count)]
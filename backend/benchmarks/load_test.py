@@ -0,0 +1,73 @@
+"""
+End-to-end concurrent load test of POST /api/v1/predict, driven in-process
+through httpx's ASGI transport with the app's real lifespan, middleware,
+micro-batcher and executors.
+"""
+import asyncio
+import itertools
+import time
+from collections import Counter
+from typing import Dict, List
+
+import httpx
+
+from benchmarks import offline  # noqa: F401  (must be imported before the app)
+from benchmarks.fixtures import unique_images
+from benchmarks.report import summarize
+
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.db.database import get_db_collection
+from app.main import app
+
+CONCURRENCY_LEVELS = [1, 8, 32]
+BENCH_USER = "loadtest@example.com"
+
+
+async def _seed_user() -> str:
+    # Tokens are minted directly; login (bcrypt) isn't what this test measures
+    await get_db_collection("users").insert_one({"email": BENCH_USER, "hashed_password": "-", "disabled": False})
+    return create_access_token(data={"sub": BENCH_USER})
+
+
+async def _drive(client: httpx.AsyncClient, images: List[bytes], requests: int, concurrency: int, headers: Dict) -> Dict:
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    payloads = itertools.cycle(images)
+    remaining = iter(range(requests))
+
+    async def worker():
+        for _ in remaining:
+            image_bytes = next(payloads)
+            started = time.perf_counter()
+            response = await client.post("/api/v1/predict", files={"file": ("bench.jpg", image_bytes, "image/jpeg")}, headers=headers)
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[response.status_code] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+    result = summarize(latencies, wall_seconds=wall)
+    result["status_codes"] = {str(code): count for code, count in sorted(statuses.items())}
+    return result
+
+
+async def _run(requests: int, concurrency_levels: List[int], authenticated: bool, use_cache: bool) -> Dict[str, Dict]:
+    # Distinct images per request so results measure the model path, not the prediction cache
+    images = unique_images(requests if not use_cache else 8)
+    settings.PREDICTION_CACHE_ENABLED = use_cache
+    results = {}
+    async with app.router.lifespan_context(app):
+        headers = {"Authorization": f"Bearer {await _seed_user()}"} if authenticated else {}
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            # Warm-up pays for pool start-up and first-batch costs outside the measurement
+            await _drive(client, images[:4], 4, 1, headers)
+            for concurrency in concurrency_levels:
+                name = f"predict/c{concurrency}" + ("/auth" if authenticated else "") + ("/cached" if use_cache else "")
+                results[name] = await _drive(client, images, requests, concurrency, headers)
+    return results
+
+
+def run_load(requests: int, concurrency_levels: List[int] = CONCURRENCY_LEVELS, authenticated: bool = False, use_cache: bool = False) -> Dict[str, Dict]:
+    return asyncio.run(_run(requests, concurrency_levels, authenticated, use_cache))
@@ -0,0 +1,48 @@
+"""
+Offline environment for the benchmarks: no MongoDB server, no .h5 weights, no network.
+
+Importing this module (before anything under `app`) points the settings at a
+throwaway configuration, swaps the Motor client for mongomock_motor and replaces
+the model loader with the app's deterministic `MockKerasAgePredictor`, whatever
+MODEL_PATH holds. Its cost model defaults to a 1 ms fixed cost per call (framework
+dispatch). Any setting can still be overridden from the environment, e.g.
+MOCK_MODEL_PER_IMAGE_MS=0.5 PREPROCESS_EXECUTOR=thread python -m benchmarks.run.
+"""
+import atexit
+import os
+import shutil
+import tempfile
+
+_BLOB_DIR = tempfile.mkdtemp(prefix="age-bench-blobs-")
+atexit.register(shutil.rmtree, _BLOB_DIR, ignore_errors=True)
+
+for _key, _value in {
+    "MONGODB_URL": "mongodb://benchmark.invalid:27017",
+    "DB_NAME": "AgePredictionBench",
+    "SECRET_KEY": "benchmark-secret-key",
+    "DEBUG": "false",
+    "HISTORY_BLOB_STORE": "local",
+    "BLOB_STORE_DIR": _BLOB_DIR,
+    "MODEL_LOAD_MODE": "eager",
+    "INFERENCE_BACKEND": "keras",
+    "MOCK_MODEL_BASE_MS": "1.0",
+}.items():
+    os.environ.setdefault(_key, _value)
+
+try:
+    from mongomock_motor import AsyncMongoMockClient
+except ImportError:
+    raise SystemExit("The benchmarks need mongomock-motor: pip install -r benchmarks/requirements.txt")
+
+import app.db.database as _database  # noqa: E402
+import app.model.registry as _registry  # noqa: E402
+from app.model.loader import create_mock_model  # noqa: E402
+
+
+def _mock_client(url, **kwargs):
+    # Pool/timeout options mean nothing to the in-memory client
+    return AsyncMongoMockClient()
+
+
+_database.AsyncIOMotorClient = _mock_client
+_registry.load_model = lambda path=None, fallback=True: create_mock_model()
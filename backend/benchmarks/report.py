@@ -0,0 +1,78 @@
+"""Latency summaries, JSON result files and run-to-run comparison."""
+import json
+import os
+import platform
+import subprocess
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+def summarize(latencies_ms: List[float], items: Optional[int] = None, wall_seconds: Optional[float] = None) -> Dict:
+    """
+    p50/p95/p99 and mean of per-call latencies, plus throughput in items/sec.
+    Throughput uses `wall_seconds` when calls overlapped (load tests), otherwise
+    the summed latency.
+    """
+    samples = np.asarray(latencies_ms, dtype=np.float64)
+    items = len(samples) if items is None else items
+    elapsed = wall_seconds if wall_seconds is not None else samples.sum() / 1000
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99]) if len(samples) else (0.0, 0.0, 0.0)
+    return {
+        "calls": int(len(samples)),
+        "items": int(items),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "mean_ms": round(float(samples.mean()), 3) if len(samples) else 0.0,
+        "throughput_per_sec": round(items / elapsed, 2) if elapsed else 0.0,
+    }
+
+
+def environment() -> Dict:
+    """What produced the numbers, so results from different machines aren't compared blindly."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_commit": commit or None,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def save(results: Dict, path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(results, indent=2))
+    print(f"💾 Results saved to {path}")
+
+
+def print_table(section: str, rows: Dict[str, Dict]):
+    print(f"\n{section}")
+    print(f"{'case':<36} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'items/s':>10}")
+    for name, row in rows.items():
+        print(f"{name:<36} {row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} {row['p99_ms']:>9.2f} {row['throughput_per_sec']:>10.1f}")
+
+
+def compare(baseline: Dict, current: Dict):
+    """Prints the relative change of every case present in both runs (negative latency change = faster)."""
+    print(f"\nComparison against run from {baseline.get('environment', {}).get('timestamp', 'unknown')}")
+    print(f"{'case':<44} {'p50':>8} {'p95':>8} {'p99':>8} {'items/s':>8}")
+    for section in ("stages", "load"):
+        for name, row in current.get(section, {}).items():
+            before = baseline.get(section, {}).get(name)
+            if before is None:
+                continue
+            changes = [_change(before[key], row[key]) for key in ("p50_ms", "p95_ms", "p99_ms", "throughput_per_sec")]
+            print(f"{f'{section}/{name}':<44} " + " ".join(f"{change:>8}" for change in changes))
+
+
+def _change(before: float, after: float) -> str:
+    if not before:
+        return "n/a"
+    return f"{(after - before) / before * 100:+.1f}%"
@@ -0,0 +1,67 @@
+"""
+Offline benchmark suite for the prediction path.
+
+Runs per-stage micro-benchmarks and an end-to-end concurrent load test against
+the ASGI app, with the app's deterministic mock model, mongomock and generated
+JPEG/PNG/WebP fixtures. Results are saved as JSON; pass --compare to diff a run
+against an earlier one.
+
+Run from the backend directory:
+    pip install -r benchmarks/requirements.txt
+    python -m benchmarks.run -o benchmarks/results/baseline.json
+    python -m benchmarks.run -o benchmarks/results/after.json --compare benchmarks/results/baseline.json
+"""
+import argparse
+import json
+import logging
+import time
+from pathlib import Path
+
+from benchmarks import offline  # noqa: F401  (must be imported before the app)
+from benchmarks.bench_stages import run_stages
+from benchmarks.load_test import CONCURRENCY_LEVELS, run_load
+from benchmarks.report import compare, environment, print_table, save
+
+from app.core.config import settings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--suite", choices=["all", "stages", "load"], default="all")
+    parser.add_argument("--iterations", type=int, default=20, help="Timed calls per stage case")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per load-test concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=CONCURRENCY_LEVELS)
+    parser.add_argument("--auth", action="store_true", help="Send a bearer token so every prediction writes history")
+    parser.add_argument("--cache", action="store_true", help="Leave the prediction cache on and repeat a few images")
+    parser.add_argument("-o", "--output", type=Path, default=Path(f"benchmarks/results/{time.strftime('%Y%m%d-%H%M%S')}.json"))
+    parser.add_argument("--compare", type=Path, help="Earlier result file to compare against")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    results = {
+        "environment": environment(),
+        "config": {
+            "inference_backend": settings.INFERENCE_BACKEND,
+            "preprocess_executor": settings.PREPROCESS_EXECUTOR,
+            "preprocess_workers": settings.PREPROCESS_WORKERS,
+            "batch_max_size": settings.BATCH_MAX_SIZE,
+            "batch_max_wait_ms": settings.BATCH_MAX_WAIT_MS,
+            "model_input_size": settings.MODEL_INPUT_SIZE,
+        },
+    }
+    if args.suite in ("all", "stages"):
+        print("⏱️  Running stage micro-benchmarks...")
+        results["stages"] = run_stages(max(1, args.iterations))
+        print_table("Stages", results["stages"])
+    if args.suite in ("all", "load"):
+        print("\n🚀 Running load test...")
+        results["load"] = run_load(max(1, args.requests), args.concurrency, args.auth, args.cache)
+        print_table("Load (POST /api/v1/predict)", results["load"])
+
+    save(results, args.output)
+    if args.compare:
+        compare(json.loads(args.compare.read_text()), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -20,7 +20,6 @@ def main():
     print("Copy the following details into your MongoDB 'users' collection:\n")
     print(f"  email: '{email}'")
     print(f"  hashed_password: '{hashed_password}'")
-    print("  history: []")
 
 if __name__ == "__main__":
     main()
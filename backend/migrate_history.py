@@ -0,0 +1,52 @@
+import asyncio
+import base64
+import sys
+
+# Add the app directory to the path to allow imports
+sys.path.append('.')
+
+from app.core.executors import executors
+from app.db.blob_store import blob_store
+from app.db.database import mongodb, get_db_collection
+from app.services.history_images import history_images
+from app.services.history_stats import history_stats
+
+async def migrate():
+    """Moves history embedded in user documents into the history collection and blob store."""
+    await mongodb.connect()
+    users = get_db_collection("users")
+    history = get_db_collection("history")
+    if users is None or history is None:
+        print("❌ MongoDB is not available.")
+        return
+
+    migrated = 0
+    async for user in users.find({"history.0": {"$exists": True}}, {"email": 1, "history": 1}):
+        for item in user["history"]:
+            if await history.find_one({"id": item["id"]}, {"_id": 1}):
+                continue
+            # Stored as "data:<type>;base64,<payload>"
+            _, _, payload = item.pop("image_base64", "").partition(",")
+            image_bytes = base64.b64decode(payload)
+            # Re-encoded and deduplicated like new uploads; sets content_key, image/thumbnail ids and content types
+            item.update(await history_images.acquire(image_bytes, blob_store.new_id(), blob_store.new_id()))
+            if item["thumbnail_id"] is None:
+                print(f"  ⚠️ No thumbnail for item {item['id']}: the image could not be re-encoded")
+            item["email"] = user["email"]
+            await history.insert_one(item)
+            migrated += 1
+        await users.update_one({"_id": user["_id"]}, {"$unset": {"history": ""}})
+        print(f"✅ Migrated history for {user['email']}")
+
+    print(f"\nDone. {migrated} history items moved out of user documents.")
+    # Same as `python -m app.cli.rebuild_stats`, so /history/stats counts the migrated items
+    users_rebuilt = await history_stats.rebuild()
+    print(f"✅ Rebuilt stats for {users_rebuilt} user{'s' if users_rebuilt != 1 else ''}")
+    executors.shutdown()
+    mongodb.close()
+
+def main():
+    asyncio.run(migrate())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+export const API_URL = import.meta.env.VITE_API_URL ?? "http://localhost:8000";
+
+// Access token from POST /api/v1/auth/token, set by the Login page
+const TOKEN_KEY = "token";
+
+export const getToken = (): string | null => localStorage.getItem(TOKEN_KEY);
+
+export const setToken = (token: string | null) => {
+  if (token) localStorage.setItem(TOKEN_KEY, token);
+  else localStorage.removeItem(TOKEN_KEY);
+};
+
+export const authHeaders = (): HeadersInit => {
+  const token = getToken();
+  return token ? { Authorization: `Bearer ${token}` } : {};
+};
@@ -1,32 +1,96 @@
-import React, { useEffect, useState } from "react";
+import React, { useCallback, useEffect, useState } from "react";
+import { API_URL, authHeaders } from "../api";
 
+const PAGE_SIZE = 12;
+
+// One entry of GET /api/v1/history (metadata only, images are fetched separately)
 interface HistoryItem {
-  id: number;
-  image: string;
-  predictedAge: number;
-  uploadedAt: string;
+  id: string;
+  predicted_age: number;
+  confidence: number;
+  created_at: string;
+  image_url: string;
+  thumbnail_url: string;
+}
+
+interface HistoryPage {
+  items: HistoryItem[];
+  next_cursor: string | null;
 }
 
+// <img> can't send the bearer token, so fetch the image and show it as an object URL
+const AuthImage: React.FC<{ src: string; alt: string; className: string }> = ({ src, alt, className }) => {
+  const [objectUrl, setObjectUrl] = useState<string | null>(null);
+
+  useEffect(() => {
+    let url: string | null = null;
+    let cancelled = false;
+    fetch(src, { headers: authHeaders() })
+      .then((res) => (res.ok ? res.blob() : Promise.reject(res.status)))
+      .then((blob) => {
+        if (cancelled) return;
+        url = URL.createObjectURL(blob);
+        setObjectUrl(url);
+      })
+      .catch(() => setObjectUrl(null));
+    return () => {
+      cancelled = true;
+      if (url) URL.revokeObjectURL(url);
+    };
+  }, [src]);
+
+  return objectUrl ? (
+    <img src={objectUrl} alt={alt} className={className} />
+  ) : (
+    <div className={`${className} bg-gray-100 animate-pulse`} />
+  );
+};
+
 const History: React.FC = () => {
   const [history, setHistory] = useState<HistoryItem[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loading, setLoading] = useState(false);
+  const [error, setError] = useState<string | null>(null);
   const [previewItem, setPreviewItem] = useState<HistoryItem | null>(null);
 
-  useEffect(() => {
-    const savedHistory = localStorage.getItem("predictionHistory");
-    if (savedHistory) setHistory(JSON.parse(savedHistory));
+  const loadPage = useCallback(async (cursor: string | null) => {
+    setLoading(true);
+    setError(null);
+    try {
+      const params = new URLSearchParams({ limit: String(PAGE_SIZE) });
+      if (cursor) params.set("cursor", cursor);
+      const res = await fetch(`${API_URL}/api/v1/history?${params}`, { headers: authHeaders() });
+      if (res.status === 401) throw new Error("Please log in to see your history.");
+      if (!res.ok) throw new Error("Could not load history.");
+      const page: HistoryPage = await res.json();
+      setHistory((prev) => (cursor ? [...prev, ...page.items] : page.items));
+      setNextCursor(page.next_cursor);
+    } catch (e) {
+      setError((e as Error).message);
+    } finally {
+      setLoading(false);
+    }
   }, []);
 
-  const handleDelete = (id: number) => {
-    const updatedHistory = history.filter(item => item.id !== id);
-    setHistory(updatedHistory);
-    localStorage.setItem("predictionHistory", JSON.stringify(updatedHistory));
+  useEffect(() => {
+    loadPage(null);
+  }, [loadPage]);
+
+  const handleDelete = async (id: string) => {
+    const res = await fetch(`${API_URL}/api/v1/history/${id}`, {
+      method: "DELETE",
+      headers: authHeaders(),
+    });
+    if (res.ok) setHistory((prev) => prev.filter((item) => item.id !== id));
   };
 
   return (
     <div className="p-6">
       <h2 className="text-2xl font-bold mb-4 text-teal-700">Prediction History</h2>
 
-      {history.length === 0 ? (
+      {error && <p className="text-red-600 mb-4">{error}</p>}
+
+      {history.length === 0 && !loading && !error ? (
         <p className="text-gray-600">No history available yet.</p>
       ) : (
         <div className="grid md:grid-cols-3 sm:grid-cols-2 gap-6">
@@ -35,9 +99,9 @@ const History: React.FC = () => {
               key={item.id}
               className="bg-white shadow-lg rounded-2xl overflow-hidden border border-gray-200 transition-transform transform hover:scale-105 relative"
             >
-              {/* Image */}
-              <img
-                src={item.image}
+              {/* Thumbnail */}
+              <AuthImage
+                src={item.thumbnail_url}
                 alt="Uploaded"
                 className="w-full h-52 object-cover"
               />
@@ -61,12 +125,12 @@ const History: React.FC = () => {
               {/* Card Content */}
               <div className="p-4">
                 <p className="text-lg font-semibold text-teal-700">
-                  Predicted Age: <span className="text-gray-800">{item.predictedAge}</span>
+                  Predicted Age: <span className="text-gray-800">{item.predicted_age}</span>
                 </p>
                 <p className="text-sm text-gray-500 mt-2">
                   Uploaded on:{" "}
                   <span className="font-medium text-gray-800">
-                    {new Date(item.uploadedAt).toLocaleString()}
+                    {new Date(item.created_at).toLocaleString()}
                   </span>
                 </p>
               </div>
@@ -75,6 +139,19 @@ const History: React.FC = () => {
         </div>
       )}
 
+      {/* Pagination */}
+      {nextCursor && (
+        <div className="flex justify-center mt-8">
+          <button
+            onClick={() => loadPage(nextCursor)}
+            disabled={loading}
+            className="bg-teal-600 text-white px-6 py-2 rounded-lg hover:bg-teal-700 transition disabled:opacity-50"
+          >
+            {loading ? "Loading..." : "Load more"}
+          </button>
+        </div>
+      )}
+
       {/* Preview Modal */}
       {previewItem && (
         <div className="fixed inset-0 bg-black bg-opacity-50 flex justify-center items-center z-50">
@@ -85,18 +162,18 @@ const History: React.FC = () => {
             >
               ×
             </button>
-            <img
-              src={previewItem.image}
+            <AuthImage
+              src={previewItem.image_url}
               alt="Preview"
               className="w-full h-80 object-contain rounded-lg mb-4"
             />
             <p className="text-lg font-semibold text-teal-700">
-              Predicted Age: <span className="text-gray-800">{previewItem.predictedAge}</span>
+              Predicted Age: <span className="text-gray-800">{previewItem.predicted_age}</span>
             </p>
             <p className="text-sm text-gray-500 mt-2">
               Uploaded on:{" "}
               <span className="font-medium text-gray-800">
-                {new Date(previewItem.uploadedAt).toLocaleString()}
+                {new Date(previewItem.created_at).toLocaleString()}
               </span>
             </p>
           </div>
@@ -1,13 +1,6 @@
 import React, { useRef, useState } from "react";
 import Webcam from "react-webcam";
-
-// History Interface
-interface HistoryItem {
-  id: number;
-  image: string;
-  predictedAge: number;
-  uploadedAt: string;
-}
+import { API_URL, authHeaders } from "../api";
 
 const Home: React.FC = () => {
   const [preview, setPreview] = useState<string | null>(null);
@@ -41,33 +34,35 @@ const Home: React.FC = () => {
     }
   };
 
-  // Predict Age (placeholder for ML model)
+  // Predict Age: when logged in, the API also saves the result to the user's history
   const predictAgeFromModel = async (image: string): Promise<number> => {
-    return 25; // temporary placeholder
+    // Works for both object URLs (uploads) and data URLs (webcam captures)
+    const blob = await (await fetch(image)).blob();
+    const form = new FormData();
+    form.append("file", blob, "image");
+    const res = await fetch(`${API_URL}/api/v1/predict`, {
+      method: "POST",
+      headers: authHeaders(),
+      body: form,
+    });
+    if (!res.ok) {
+      const body = await res.json().catch(() => null);
+      throw new Error(body?.detail ?? "Prediction failed");
+    }
+    return (await res.json()).age;
   };
 
   // Handle Predict
   const handlePredict = async () => {
     if (!preview) return;
 
-    const predictedAge = await predictAgeFromModel(preview);
-
-    // Save history to localStorage
-    const savedHistory = localStorage.getItem("predictionHistory");
-    const history: HistoryItem[] = savedHistory ? JSON.parse(savedHistory) : [];
-    const newItem: HistoryItem = {
-      id: history.length + 1,
-      image: preview,
-      predictedAge,
-      uploadedAt: new Date().toISOString(),
-    };
-    localStorage.setItem(
-      "predictionHistory",
-      JSON.stringify([newItem, ...history])
-    );
-
-    setPreview(null);
-    alert(`Predicted Age: ${predictedAge}`);
+    try {
+      const predictedAge = await predictAgeFromModel(preview);
+      setPreview(null);
+      alert(`Predicted Age: ${predictedAge}`);
+    } catch (e) {
+      alert((e as Error).message);
+    }
   };
 
   return (
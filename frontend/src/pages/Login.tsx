@@ -1,18 +1,30 @@
 import React, { useState } from "react";
 import { useNavigate } from "react-router-dom";
+import { API_URL, setToken } from "../api";
 
 const Login: React.FC = () => {
   const [username, setUsername] = useState("");
   const [password, setPassword] = useState("");
   const navigate = useNavigate();
 
-  const handleLogin = () => {
-    if (username && password) {
-      // Navigate to Home/Capture page after login
-      navigate("/capture");
-    } else {
+  const handleLogin = async () => {
+    if (!username || !password) {
       alert("Please enter username and password");
+      return;
     }
+    // OAuth2 password flow: form-encoded, the email goes in "username"
+    const res = await fetch(`${API_URL}/api/v1/auth/token`, {
+      method: "POST",
+      body: new URLSearchParams({ username, password }),
+    }).catch(() => null);
+    if (!res || !res.ok) {
+      alert(res?.status === 401 ? "Incorrect username or password" : "Could not log in, please try again");
+      return;
+    }
+    const { access_token } = await res.json();
+    setToken(access_token);
+    // Navigate to Home/Capture page after login
+    navigate("/capture");
   };
 
   return (